@@ -2,6 +2,8 @@ from app.core.database import Base
 from app.models.subcategories import Subcategory
 from app.models.categories import Category
 from app.models.blog import Blog
+from app.models.id_sequences import IdSequence
+from app.models.media import MediaObject
 import sys
 import os
 from logging.config import fileConfig
@@ -0,0 +1,35 @@
+"""Add id_sequences for hi/lo public id allocation
+
+Revision ID: 5b7c1d2e9a4f
+Revises: 3ee100b99e81
+Create Date: 2026-10-18 09:12:41.208311
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b7c1d2e9a4f'
+down_revision: Union[str, None] = '3ee100b99e81'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('id_sequences',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('next_value', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    # Continue numbering after the rows that already exist; the old generators
+    # produced <prefix>_<max(id) + 1>, which never exceeds the highest id
+    op.execute("INSERT INTO id_sequences (name, next_value) SELECT 'blog', COALESCE(MAX(id), 0) + 1 FROM blog")
+    op.execute("INSERT INTO id_sequences (name, next_value) SELECT 'cat', COALESCE(MAX(id), 0) + 1 FROM categories")
+    op.execute("INSERT INTO id_sequences (name, next_value) SELECT 'subcat', COALESCE(MAX(id), 0) + 1 FROM subcategories")
+
+
+def downgrade() -> None:
+    op.drop_table('id_sequences')
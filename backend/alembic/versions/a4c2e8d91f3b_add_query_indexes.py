@@ -0,0 +1,52 @@
+"""Add indexes for the blog listing, pagination, export and subcategory queries
+
+Revision ID: a4c2e8d91f3b
+Revises: 8d3e6f1a2b7c
+Create Date: 2026-10-18 14:21:06.318274
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4c2e8d91f3b'
+down_revision: Union[str, None] = '8d3e6f1a2b7c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Written like the services' filters (is_active = true, or = 1 on SQLite), so the planner
+# can prove each partial index applies to the query
+ACTIVE_BLOG = sa.column('is_active') == sa.true()
+ACTIVE_SUBCATEGORY = sa.column('is_active') == sa.true()
+HAS_IMAGE = sa.column('image').is_not(None)
+
+# name, table, columns/expressions, partial index predicate
+INDEXES = [
+    ('ix_blog_active_id', 'blog', ['id'], ACTIVE_BLOG),
+    ('ix_blog_active_created_on_id', 'blog', ['created_on', 'id'], ACTIVE_BLOG),
+    ('ix_blog_subcategory_active_id', 'blog', ['subcategory_id', 'id'], ACTIVE_BLOG),
+    ('ix_blog_subcategory_id_is_active', 'blog', ['subcategory_id', 'is_active'], None),
+    ('ix_blog_modified_on', 'blog', [sa.text('coalesce(updated_on, created_on)')], None),
+    ('ix_blog_image', 'blog', ['image'], HAS_IMAGE),
+    ('ix_subcategories_category_active_id', 'subcategories', ['category_id', 'id'], ACTIVE_SUBCATEGORY),
+]
+
+
+def upgrade() -> None:
+    # CONCURRENTLY (PostgreSQL) builds without blocking writes on a large blog table,
+    # but cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name, table, columns, unique=False, if_not_exists=True,
+                postgresql_where=where, sqlite_where=where, postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
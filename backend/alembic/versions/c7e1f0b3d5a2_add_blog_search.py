@@ -0,0 +1,63 @@
+"""Add full-text search over blog titles and content
+
+Revision ID: c7e1f0b3d5a2
+Revises: a4c2e8d91f3b
+Create Date: 2026-10-18 16:02:44.918305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e1f0b3d5a2'
+down_revision: Union[str, None] = 'a4c2e8d91f3b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_CONFIG = 'english'
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        # Adding a stored generated column rewrites the blog table under an exclusive lock;
+        # run this in a maintenance window on large installations
+        op.execute(
+            "ALTER TABLE blog ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+            f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(content, '')), 'B')) STORED"
+        )
+        with op.get_context().autocommit_block():
+            op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_blog_search_vector ON blog USING gin (search_vector)")
+    else:
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS blog_fts USING fts5("
+            "title, content, content='blog', content_rowid='id', tokenize='porter unicode61')"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS blog_fts_insert AFTER INSERT ON blog BEGIN "
+            "INSERT INTO blog_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS blog_fts_delete AFTER DELETE ON blog BEGIN "
+            "INSERT INTO blog_fts(blog_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); END"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS blog_fts_update AFTER UPDATE OF title, content ON blog BEGIN "
+            "INSERT INTO blog_fts(blog_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); "
+            "INSERT INTO blog_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END"
+        )
+        # Index the rows that already exist
+        op.execute("INSERT INTO blog_fts(blog_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_blog_search_vector")
+        op.execute("ALTER TABLE blog DROP COLUMN IF EXISTS search_vector")
+    else:
+        for trigger in ('blog_fts_update', 'blog_fts_delete', 'blog_fts_insert'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS blog_fts")
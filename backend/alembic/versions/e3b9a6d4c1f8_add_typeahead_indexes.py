@@ -0,0 +1,65 @@
+"""Add prefix and trigram indexes over blog titles for typeahead
+
+Revision ID: e3b9a6d4c1f8
+Revises: c7e1f0b3d5a2
+Create Date: 2026-10-18 17:40:12.503961
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3b9a6d4c1f8'
+down_revision: Union[str, None] = 'c7e1f0b3d5a2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        # CONCURRENTLY builds without blocking writes, but cannot run inside a transaction
+        with op.get_context().autocommit_block():
+            op.execute(
+                'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_blog_title_prefix '
+                'ON blog (lower(title) COLLATE "C") WHERE is_active = true'
+            )
+            op.execute(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_blog_title_trgm "
+                "ON blog USING gist (lower(title) gist_trgm_ops) WHERE is_active = true"
+            )
+    else:
+        op.execute("CREATE INDEX IF NOT EXISTS ix_blog_title_prefix ON blog (lower(title)) WHERE is_active = 1")
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS blog_title_trgm USING fts5("
+            "title, content='blog', content_rowid='id', tokenize='trigram')"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS blog_title_trgm_insert AFTER INSERT ON blog BEGIN "
+            "INSERT INTO blog_title_trgm(rowid, title) VALUES (new.id, new.title); END"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS blog_title_trgm_delete AFTER DELETE ON blog BEGIN "
+            "INSERT INTO blog_title_trgm(blog_title_trgm, rowid, title) VALUES ('delete', old.id, old.title); END"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS blog_title_trgm_update AFTER UPDATE OF title ON blog BEGIN "
+            "INSERT INTO blog_title_trgm(blog_title_trgm, rowid, title) VALUES ('delete', old.id, old.title); "
+            "INSERT INTO blog_title_trgm(rowid, title) VALUES (new.id, new.title); END"
+        )
+        # Index the rows that already exist
+        op.execute("INSERT INTO blog_title_trgm(blog_title_trgm) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_blog_title_trgm")
+            op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_blog_title_prefix")
+    else:
+        for trigger in ('blog_title_trgm_update', 'blog_title_trgm_delete', 'blog_title_trgm_insert'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS blog_title_trgm")
+        op.execute("DROP INDEX IF EXISTS ix_blog_title_prefix")
@@ -0,0 +1,294 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, Optional
+from app.core.config import settings
+from app.core.logging import logging
+from app.core.responses import json_dumps
+
+# Pub/sub channel on which shared-tier caches announce invalidations to every worker
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+
+class LRUCache:
+    """In-process LRU cache with a per-entry TTL."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.expirations += 1
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        self._data[key] = (time.monotonic() + (ttl if ttl is not None else self.ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: str):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class InMemorySharedCache:
+    """Process-local stand-in for the shared tier, used for tests and single-node setups."""
+
+    # Nothing outside this process can hold a copy, so there is nobody to notify
+    broadcasts = False
+
+    def __init__(self):
+        self._data: Dict[str, tuple] = {}
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            self._data.pop(key, None)
+            return None
+        return value
+
+    async def set(self, key: str, value: str, ttl: float):
+        self._data[key] = (time.monotonic() + ttl, value)
+
+    async def delete(self, key: str):
+        self._data.pop(key, None)
+
+    async def clear(self, prefix: str):
+        for key in [key for key in self._data if key.startswith(prefix)]:
+            del self._data[key]
+
+
+class RedisSharedCache:
+    """Shared tier backed by Redis; requires the optional ``redis`` package."""
+
+    broadcasts = True
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+        self._client = redis.from_url(url, decode_responses=True)
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self._client.get(key)
+
+    async def set(self, key: str, value: str, ttl: float):
+        await self._client.set(key, value, ex=max(int(ttl), 1))
+
+    async def delete(self, key: str):
+        await self._client.delete(key)
+
+    async def clear(self, prefix: str):
+        async for key in self._client.scan_iter(match=f"{prefix}*"):
+            await self._client.delete(key)
+
+    async def publish(self, channel: str, message: str):
+        await self._client.publish(channel, message)
+
+    async def listen(self, channel: str) -> AsyncIterator[str]:
+        pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(channel)
+        try:
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    yield message["data"]
+        finally:
+            await pubsub.aclose()
+
+
+def create_shared_cache(url: Optional[str]):
+    if not url:
+        return None
+    if url.startswith("memory://"):
+        return InMemorySharedCache()
+    if url.startswith(("redis://", "rediss://")):
+        try:
+            return RedisSharedCache(url)
+        except ImportError:
+            logging.error("CACHE_SHARED_URL points at Redis but the 'redis' package is not installed; shared cache disabled.")
+            return None
+    logging.error(f"Unsupported CACHE_SHARED_URL scheme: {url}; shared cache disabled.")
+    return None
+
+
+class TwoTierCache:
+    """Read-through cache: in-process LRU in front of an optional shared tier.
+
+    Values must be JSON serialisable; they are stored as JSON in the shared tier.
+    With a Redis shared tier every invalidation is also published, and each
+    worker's listener drops its local copy. Without one the local tiers of other
+    workers are not reached, so an entry there may be served for up to the local
+    TTL (CACHE_LOCAL_TTL) after a write.
+    """
+
+    def __init__(self, namespace: str, local: LRUCache, shared=None, shared_ttl: float = 300.0,
+                 repeat_invalidation_after: Optional[float] = None):
+        self.namespace = namespace
+        self.local = local
+        self.shared = shared
+        self.shared_ttl = shared_ttl
+        # With read replicas, a read that raced the write can refill an entry from a lagging
+        # replica after it was invalidated; deletes are repeated once the lag window has passed
+        self.repeat_invalidation_after = repeat_invalidation_after
+        self._repeats: set = set()
+        self._listener: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    def _key(self, key) -> str:
+        return f"{self.namespace}:{key}"
+
+    async def get(self, key) -> Optional[Any]:
+        full_key = self._key(key)
+        value = self.local.get(full_key)
+        if value is not None:
+            self.hits += 1
+            return value
+        if self.shared is not None:
+            try:
+                raw = await self.shared.get(full_key)
+            except Exception as e:
+                logging.error(f"Shared cache read failed for {full_key}: {str(e)}")
+                raw = None
+            if raw is not None:
+                value = json.loads(raw)
+                self.local.set(full_key, value)
+                self.shared_hits += 1
+                return value
+        self.misses += 1
+        return None
+
+    async def set(self, key, value: Any):
+        full_key = self._key(key)
+        # Round-trip through JSON so both tiers hand out identical payloads
+        raw = json_dumps(value).decode("utf-8")
+        self.local.set(full_key, json.loads(raw))
+        if self.shared is not None:
+            try:
+                await self.shared.set(full_key, raw, self.shared_ttl)
+            except Exception as e:
+                logging.error(f"Shared cache write failed for {full_key}: {str(e)}")
+
+    async def delete(self, key):
+        await self._delete(self._key(key))
+        self._repeat(self._delete, self._key(key))
+
+    async def _delete(self, full_key: str):
+        self.local.delete(full_key)
+        if self.shared is not None:
+            try:
+                await self.shared.delete(full_key)
+            except Exception as e:
+                logging.error(f"Shared cache delete failed for {full_key}: {str(e)}")
+        await self._broadcast(full_key)
+
+    async def clear(self):
+        await self._clear()
+        self._repeat(self._clear)
+
+    async def _clear(self):
+        self.local.clear()
+        if self.shared is not None:
+            try:
+                await self.shared.clear(f"{self.namespace}:")
+            except Exception as e:
+                logging.error(f"Shared cache clear failed for {self.namespace}: {str(e)}")
+        # A bare "<namespace>:" clears the whole local tier
+        await self._broadcast(self._key(""))
+
+    async def _broadcast(self, message: str):
+        if self.shared is None or not self.shared.broadcasts:
+            return
+        try:
+            await self.shared.publish(INVALIDATION_CHANNEL, message)
+        except Exception as e:
+            logging.error(f"Cache invalidation publish failed for {message}: {str(e)}")
+
+    def _invalidated(self, message: str):
+        if message == self._key(""):
+            self.local.clear()
+        elif message.startswith(self._key("")):
+            self.local.delete(message)
+
+    async def _listen(self):
+        while True:
+            try:
+                async for message in self.shared.listen(INVALIDATION_CHANNEL):
+                    self._invalidated(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Cache invalidation listener for {self.namespace} failed: {str(e)}")
+            # Anything published while disconnected was missed
+            self.local.clear()
+            await asyncio.sleep(1.0)
+
+    def start_listener(self):
+        if self.shared is not None and self.shared.broadcasts and self._listener is None:
+            self._listener = asyncio.get_running_loop().create_task(self._listen())
+
+    async def stop_listener(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    def _repeat(self, invalidate, *args):
+        if not self.repeat_invalidation_after:
+            return
+
+        async def later():
+            await asyncio.sleep(self.repeat_invalidation_after)
+            await invalidate(*args)
+
+        task = asyncio.get_running_loop().create_task(later())
+        self._repeats.add(task)
+        task.add_done_callback(self._repeats.discard)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "evictions": self.local.evictions,
+            "expirations": self.local.expirations,
+            "local_size": len(self.local),
+            "shared_enabled": self.shared is not None,
+        }
+
+
+# Serialized payloads for GET /api/blog/{blog_detail_id}
+blog_detail_cache = TwoTierCache(
+    "blog_detail",
+    LRUCache(maxsize=settings.CACHE_LOCAL_MAXSIZE, ttl=settings.CACHE_LOCAL_TTL),
+    shared=create_shared_cache(settings.CACHE_SHARED_URL),
+    shared_ttl=settings.CACHE_SHARED_TTL,
+    repeat_invalidation_after=(
+        settings.DB_REPLICA_MAX_LAG_SECONDS + settings.DB_REPLICA_HEALTH_INTERVAL
+        if settings.DATABASE_REPLICA_URLS else None
+    ),
+)
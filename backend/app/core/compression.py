@@ -0,0 +1,240 @@
+import time
+import zlib
+from typing import Callable, Dict, List, Optional, Tuple
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional
+    zstandard = None
+
+# Types that are already compressed (or not worth it) are passed through untouched
+INCOMPRESSIBLE_PREFIXES = ("image/", "video/", "audio/", "font/woff", "application/zip", "application/gzip",
+                           "application/x-7z", "application/pdf", "application/octet-stream")
+
+
+class _GzipEncoder:
+    def __init__(self, level: int):
+        # wbits=31 selects the gzip container
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class _BrotliEncoder:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class _ZstdEncoder:
+    def __init__(self, level: int):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+
+class CompressionStats:
+    def __init__(self):
+        self.responses: Dict[str, int] = {}
+        self.skipped = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu_seconds = 0.0
+
+    def record(self, encoding: str, bytes_in: int, bytes_out: int, cpu_seconds: float):
+        self.responses[encoding] = self.responses.get(encoding, 0) + 1
+        self.bytes_in += bytes_in
+        self.bytes_out += bytes_out
+        self.cpu_seconds += cpu_seconds
+
+    def stats(self) -> dict:
+        return {
+            "responses": dict(self.responses),
+            "skipped": self.skipped,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "ratio": round(self.bytes_in / self.bytes_out, 3) if self.bytes_out else None,
+            "cpu_ms": round(self.cpu_seconds * 1000, 3),
+        }
+
+
+compression_stats = CompressionStats()
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    accepted = {}
+    for item in header.split(","):
+        parts = [part.strip() for part in item.split(";")]
+        if not parts[0]:
+            continue
+        quality = 1.0
+        for param in parts[1:]:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        accepted[parts[0].lower()] = quality
+    return accepted
+
+
+class CompressionMiddleware:
+    """Negotiates zstd/br/gzip from Accept-Encoding for buffered and streaming responses."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        zstd_level: int = 3,
+        exclude_paths: Tuple[str, ...] = ("/media",),
+        stats: CompressionStats = compression_stats,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.exclude_paths = exclude_paths
+        self.stats = stats
+        # Server preference when the client weights encodings equally
+        self.encoders: List[Tuple[str, Callable]] = []
+        if zstandard is not None:
+            self.encoders.append(("zstd", lambda: _ZstdEncoder(zstd_level)))
+        if brotli is not None:
+            self.encoders.append(("br", lambda: _BrotliEncoder(brotli_quality)))
+        self.encoders.append(("gzip", lambda: _GzipEncoder(gzip_level)))
+
+    def select_encoding(self, header: str) -> Optional[Tuple[str, Callable]]:
+        accepted = parse_accept_encoding(header)
+        best, best_quality = None, 0.0
+        for name, factory in self.encoders:
+            quality = accepted.get(name, accepted.get("*", 0.0))
+            if quality > best_quality:
+                best, best_quality = (name, factory), quality
+        return best
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"].startswith(self.exclude_paths):
+            await self.app(scope, receive, send)
+            return
+        selected = self.select_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if selected is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressionResponder(self, *selected, send)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, factory: Callable, send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.factory = factory
+        self.downstream = send
+        self.start_message: Optional[Message] = None
+        self.encoder = None
+        self.passthrough = False
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu_seconds = 0.0
+
+    def _compressible(self, headers: Headers) -> bool:
+        if "content-encoding" in headers or self.start_message["status"] in (204, 206, 304):
+            return False
+        content_type = headers.get("content-type", "").lower()
+        return not content_type.startswith(INCOMPRESSIBLE_PREFIXES)
+
+    def _encode(self, data: bytes, final: bool) -> bytes:
+        started = time.thread_time()
+        out = self.encoder.compress(data) if data else b""
+        out += self.encoder.finish() if final else self.encoder.flush()
+        self.cpu_seconds += time.thread_time() - started
+        self.bytes_in += len(data)
+        self.bytes_out += len(out)
+        return out
+
+    def _finish_stats(self):
+        self.middleware.stats.record(self.encoding, self.bytes_in, self.bytes_out, self.cpu_seconds)
+
+    def _compressed_headers(self, content_length: Optional[int]):
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        if content_length is None:
+            del headers["Content-Length"]
+        else:
+            headers["Content-Length"] = str(content_length)
+        # A strong validator must not be shared between encodings of the same resource
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = f"W/{etag}"
+
+    async def send(self, message: Message):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            if not self._compressible(Headers(raw=message["headers"])):
+                self.passthrough = True
+                await self.downstream(message)
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.downstream(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.encoder is None:
+            if not more_body and len(body) < self.middleware.minimum_size:
+                # Small buffered response: not worth the CPU
+                self.passthrough = True
+                self.middleware.stats.skipped += 1
+                headers = MutableHeaders(raw=self.start_message["headers"])
+                headers.add_vary_header("Accept-Encoding")
+                await self.downstream(self.start_message)
+                await self.downstream(message)
+                return
+            self.encoder = self.factory()
+            if not more_body:
+                compressed = self._encode(body, final=True)
+                self._compressed_headers(len(compressed))
+                self._finish_stats()
+                await self.downstream(self.start_message)
+                await self.downstream({"type": "http.response.body", "body": compressed})
+                return
+            # Streaming response: length is unknown up front, flush each chunk as it arrives
+            self._compressed_headers(None)
+            await self.downstream(self.start_message)
+
+        compressed = self._encode(body, final=not more_body)
+        if not more_body:
+            self._finish_stats()
+        await self.downstream({"type": "http.response.body", "body": compressed, "more_body": more_body})
@@ -1,7 +1,7 @@
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 import json
 import os
 
@@ -27,6 +27,87 @@ class Settings(BaseSettings):
     EMAIL_HOST_USER: str
     EMAIL_HOST_PASSWORD: str
     MAIN_FROM_NAME: str
+    # Database engine: pool sizing per worker process (pool_size + max_overflow connections at
+    # most), pre-ping before reuse, asyncpg prepared statement cache, and DB_PGBOUNCER for
+    # PgBouncer transaction pooling, which cannot use named prepared statements
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_PGBOUNCER: bool = False
+    # Read replicas (same URL format as DATABASE_URL), used by read-only routes. Replicas more
+    # than DB_REPLICA_MAX_LAG_SECONDS behind or failing health checks are skipped, and a client
+    # that just wrote reads from the primary for DB_READ_AFTER_WRITE_SECONDS
+    DATABASE_REPLICA_URLS: List[str] = []
+    DB_REPLICA_MAX_LAG_SECONDS: float = 5.0
+    DB_REPLICA_HEALTH_INTERVAL: float = 5.0
+    DB_REPLICA_HEALTH_TIMEOUT: float = 2.0
+    DB_READ_AFTER_WRITE_SECONDS: float = 10.0
+    # SQL logging: DATABASE_ECHO logs every statement (development only); otherwise statements
+    # slower than DB_SLOW_QUERY_MS are logged, plus a DB_SQL_LOG_SAMPLE_RATE fraction of the rest
+    DATABASE_ECHO: bool = False
+    DB_SLOW_QUERY_MS: float = 500.0
+    DB_SQL_LOG_SAMPLE_RATE: float = 0.0
+    DB_SQL_LOG_MAX_LENGTH: int = 1000
+    # Seconds a worker trusts its in-memory category/subcategory snapshot before re-checking
+    # the stored taxonomy version (one primary-key read); writes bump the version
+    TAXONOMY_CHECK_INTERVAL: float = 2.0
+    # Blog detail cache: in-process LRU tier plus optional shared tier
+    # (memory:// for a local stand-in, redis://host:port/db for Redis). Redis also carries
+    # invalidations to every worker's local tier; without it, other workers may serve a stale
+    # entry for up to CACHE_LOCAL_TTL seconds after a write
+    CACHE_LOCAL_MAXSIZE: int = 1024
+    CACHE_LOCAL_TTL: float = 30.0
+    CACHE_SHARED_URL: Optional[str] = None
+    CACHE_SHARED_TTL: float = 300.0
+    # Response compression (zstd/br are used only when zstandard/brotli are installed)
+    COMPRESSION_MIN_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    COMPRESSION_ZSTD_LEVEL: int = 3
+    # Public ids (blog_N, cat_N, subcat_N) reserved per worker per round trip
+    ID_BLOCK_SIZE: int = 50
+    # Streaming blog import: rows per INSERT/transaction
+    IMPORT_CHUNK_SIZE: int = 500
+    IMPORT_MAX_CHUNK_SIZE: int = 5000
+    # Rows fetched per round trip by the server-side cursor of the blog export
+    EXPORT_YIELD_PER: int = 1000
+    # Largest accepted image upload, in bytes
+    MAX_UPLOAD_SIZE: int = 10 * 1024 * 1024
+    # Multipart bodies may exceed MAX_UPLOAD_SIZE by this much (form fields, part headers) before
+    # they are refused unparsed
+    MAX_UPLOAD_FORM_OVERHEAD: int = 1024 * 1024
+    # Resized image derivatives (requires Pillow); widths are in pixels and
+    # formats are tried in this order when negotiating against Accept
+    IMAGE_DERIVATIVE_WIDTHS: List[int] = [320, 640, 1280]
+    IMAGE_DERIVATIVE_FORMATS: List[str] = ["avif", "webp"]
+    IMAGE_DERIVATIVE_QUALITY: int = 75
+    IMAGE_DERIVATIVE_WORKERS: int = 2
+    # /media serving: max-age for legacy (unhashed) files, open descriptors kept for hot files
+    MEDIA_CACHE_MAX_AGE: int = 3600
+    MEDIA_FD_CACHE_SIZE: int = 256
+    # Media storage backend: unset/file://<dir> for local disk, s3://bucket/prefix for an
+    # S3-compatible store (MEDIA_S3_ENDPOINT_URL points it at MinIO or another stand-in)
+    MEDIA_STORAGE_URL: Optional[str] = None
+    MEDIA_S3_ENDPOINT_URL: Optional[str] = None
+    MEDIA_S3_REGION: Optional[str] = None
+    MEDIA_S3_PUBLIC_URL: Optional[str] = None
+    MEDIA_S3_MULTIPART_THRESHOLD: int = 8 * 1024 * 1024
+    # Lifetime of presigned upload/download URLs, in seconds
+    MEDIA_PRESIGN_TTL: int = 900
+    # Orphaned media collector: off by default and a dry run until switched over; enable it on
+    # one instance only. Files younger than the grace period are never touched, and images of
+    # blogs soft-deleted longer than the retention (when set) are released for collection
+    MEDIA_GC_ENABLED: bool = False
+    MEDIA_GC_DRY_RUN: bool = True
+    MEDIA_GC_QUARANTINE: bool = False
+    MEDIA_GC_GRACE_SECONDS: int = 24 * 3600
+    MEDIA_GC_BATCH_SIZE: int = 500
+    MEDIA_GC_BATCH_DELAY: float = 1.0
+    MEDIA_GC_INTERVAL: int = 6 * 3600
+    MEDIA_GC_INACTIVE_RETENTION_SECONDS: Optional[int] = None
 
     class Config:
         env_file = ".env"
@@ -1,21 +1,320 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+import asyncio
+import itertools
+import random
+import re
+import time
+from typing import List, Optional
+from uuid import uuid4
+from fastapi import Request, Response
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, AsyncEngine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.core.config import settings
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.exc import SQLAlchemyError, TimeoutError as PoolTimeoutError
 from app.core.logging import logging
 from sqlalchemy.orm import declarative_base
 
+
+class PoolStats:
+    """Checkout waits and saturation of one engine's connection pool."""
+
+    def __init__(self):
+        self.engine = None
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.queries = 0
+        self.slow_queries = 0
+        self.query_seconds = 0.0
+
+    def record_wait(self, seconds: float):
+        self.checkouts += 1
+        self.wait_seconds += seconds
+        self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+
+    def stats(self) -> dict:
+        pool = self.engine.pool if self.engine is not None else None
+        queued = isinstance(pool, AsyncAdaptedQueuePool)
+        capacity = pool.size() + pool._max_overflow if queued else None
+        return {
+            "pool_size": pool.size() if queued else None,
+            "max_overflow": pool._max_overflow if queued else None,
+            "checked_out": pool.checkedout() if queued else None,
+            "overflow": max(pool.overflow(), 0) if queued else None,
+            "saturation": round(pool.checkedout() / capacity, 3) if capacity else None,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_avg_ms": round(self.wait_seconds / self.checkouts * 1000, 3) if self.checkouts else None,
+            "wait_max_ms": round(self.max_wait_seconds * 1000, 3),
+            "queries": self.queries,
+            "slow_queries": self.slow_queries,
+            "query_ms": round(self.query_seconds * 1000, 3),
+        }
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that times how long each checkout waits for a free connection."""
+
+    pool_stats: PoolStats
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            self.pool_stats.timeouts += 1
+            raise
+        finally:
+            self.pool_stats.record_wait(time.perf_counter() - started)
+
+    def recreate(self):
+        # engine.dispose() swaps in a fresh pool; keep counting into the same stats
+        pool = super().recreate()
+        pool.pool_stats = self.pool_stats
+        return pool
+
+
+# Per-engine pool/query statistics, keyed by engine name, for /metrics
+pool_stats = {}
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _log_statements(engine: AsyncEngine, stats: PoolStats):
+    """Structured, sampled SQL logging instead of echo: slow statements always, others at DB_SQL_LOG_SAMPLE_RATE.
+
+    Parameters are never logged, only the statement text, timing and row count.
+    """
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        stats.queries += 1
+        stats.query_seconds += elapsed
+        slow = elapsed * 1000 >= settings.DB_SLOW_QUERY_MS
+        if slow:
+            stats.slow_queries += 1
+        if slow or random.random() < settings.DB_SQL_LOG_SAMPLE_RATE:
+            text = _WHITESPACE.sub(" ", statement).strip()[:settings.DB_SQL_LOG_MAX_LENGTH]
+            (logging.warning if slow else logging.info)(
+                f"sql engine={engine.url.drivername} duration_ms={elapsed * 1000:.3f} "
+                f"rows={cursor.rowcount} executemany={executemany} slow={slow} statement=\"{text}\""
+            )
+
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def handle_error(context):
+        # A statement failing in execute never reaches after_cursor_execute; drop its start time so the
+        # stack stays paired (fetch errors come without a statement and were already popped)
+        if context.connection is None or context.execution_context is None or context.statement is None:
+            return
+        started = context.connection.info.get("query_started")
+        if started:
+            started.pop()
+
+
+def engine_options(url: str) -> dict:
+    """create_async_engine keyword arguments for ``url`` from the DB_* settings."""
+    options = {"echo": settings.DATABASE_ECHO, "pool_pre_ping": settings.DB_POOL_PRE_PING}
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        # In-memory SQLite lives in a single connection; keep SQLAlchemy's default StaticPool
+        return options
+    options.update(
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+    )
+    if parsed.get_driver_name() == "asyncpg":
+        if settings.DB_PGBOUNCER:
+            # Transaction pooling hands each transaction to any server connection, where a
+            # named prepared statement may not exist: no statement caches, unique names
+            options["connect_args"] = {
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+                "prepared_statement_name_func": lambda: f"__asyncpg_{uuid4()}__",
+            }
+        else:
+            options["connect_args"] = {"prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE}
+    return options
+
+
+def build_engine(url: str, name: str) -> AsyncEngine:
+    built = create_async_engine(url, **engine_options(url))
+    stats = pool_stats[name] = PoolStats()
+    stats.engine = built
+    if isinstance(built.pool, InstrumentedQueuePool):
+        built.pool.pool_stats = stats
+    _log_statements(built, stats)
+    return built
+
+
 # Set up database engine and session
-engine = create_async_engine(settings.DATABASE_URL, echo=True)
+engine = build_engine(settings.DATABASE_URL, "primary")
 async_session = sessionmaker(
     bind=engine, class_=AsyncSession, expire_on_commit=False
 )
 
 Base = declarative_base()
 
-# Dependency to get the database session
-async def get_db() -> AsyncSession:
-    session: AsyncSession = async_session()
+
+def dialect_insert(session: AsyncSession, model):
+    """Dialect specific INSERT construct, for ON CONFLICT support on PostgreSQL and SQLite."""
+    dialect = session.bind.dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"ON CONFLICT inserts are not supported on {dialect}")
+    return insert(model)
+
+class Replica:
+    """A read replica: its own engine and pool, plus the last health check's verdict."""
+
+    def __init__(self, name: str, url: str):
+        self.name = name
+        self.engine = build_engine(url, name)
+        self.sessionmaker = sessionmaker(bind=self.engine, class_=AsyncSession, expire_on_commit=False)
+        # Unhealthy until the first check has passed
+        self.healthy = False
+        self.lag: Optional[float] = None
+        self.failures = 0
+        self.reads = 0
+
+    def checked_out(self) -> int:
+        pool = self.engine.pool
+        return pool.checkedout() if isinstance(pool, AsyncAdaptedQueuePool) else 0
+
+    def stats(self) -> dict:
+        return {"healthy": self.healthy, "lag_seconds": self.lag, "failures": self.failures, "reads": self.reads}
+
+
+replicas: List[Replica] = [
+    Replica(f"replica_{index}", url) for index, url in enumerate(settings.DATABASE_REPLICA_URLS)
+]
+primary_reads = 0
+
+# Seconds the replica is behind the primary; 0 when it has replayed everything it received,
+# so an idle primary does not make the replica look stale
+POSTGRES_LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+# Set on responses to writes; reads from that client stay on the primary until it expires
+PRIMARY_STICKY_COOKIE = "db_primary_until"
+# Request state key get_db leaves the cookie's expiry under, for ReadAfterWriteMiddleware
+PRIMARY_STICKY_STATE = "primary_sticky_until"
+
+_rotation = itertools.count()
+_monitor: Optional[asyncio.Task] = None
+
+
+async def replica_lag(replica: Replica):
+    async with replica.engine.connect() as conn:
+        query = POSTGRES_LAG_QUERY if conn.dialect.name == "postgresql" else text("SELECT 0")
+        return await conn.scalar(query)
+
+
+async def check_replica(replica: Replica):
+    try:
+        # The timeout covers the connect too: an unreachable host must not stall the monitor
+        lag = await asyncio.wait_for(replica_lag(replica), settings.DB_REPLICA_HEALTH_TIMEOUT)
+        replica.lag = float(lag or 0)
+        healthy = replica.lag <= settings.DB_REPLICA_MAX_LAG_SECONDS
+        if not healthy and replica.healthy:
+            logging.warning(f"Replica {replica.name} is {replica.lag:.1f}s behind; reads go elsewhere.")
+        replica.healthy = healthy
+    except Exception as e:
+        if replica.healthy:
+            logging.error(f"Replica {replica.name} failed its health check: {str(e)}")
+        replica.healthy = False
+        replica.failures += 1
+
+
+async def _monitor_replicas():
+    while True:
+        await asyncio.sleep(settings.DB_REPLICA_HEALTH_INTERVAL)
+        await asyncio.gather(*(check_replica(replica) for replica in replicas))
+
+
+async def start_replica_monitor():
+    global _monitor
+    if replicas and _monitor is None:
+        # Check once before serving so healthy replicas take reads from the first request
+        await asyncio.gather(*(check_replica(replica) for replica in replicas))
+        _monitor = asyncio.get_running_loop().create_task(_monitor_replicas())
+
+
+async def stop_replica_monitor():
+    global _monitor
+    if _monitor is not None:
+        _monitor.cancel()
+        try:
+            await _monitor
+        except asyncio.CancelledError:
+            pass
+        _monitor = None
+
+
+def pick_replica() -> Optional[Replica]:
+    healthy = [replica for replica in replicas if replica.healthy]
+    if not healthy:
+        return None
+    # Least busy pool wins; rotating the starting point spreads ties evenly
+    start = next(_rotation) % len(healthy)
+    return min(healthy[start:] + healthy[:start], key=Replica.checked_out)
+
+
+def read_session(sticky: bool = False) -> AsyncSession:
+    """A session for read-only work: a healthy replica when there is one, otherwise the primary."""
+    global primary_reads
+    replica = None if sticky else pick_replica()
+    if replica is None:
+        primary_reads += 1
+        session = async_session()
+        # Pinned by a recent write: callers must not answer from anything a replica may have filled
+        session.info["primary_pinned"] = sticky
+        return session
+    replica.reads += 1
+    session = replica.sessionmaker()
+    session.info["replica"] = replica.name
+    return session
+
+
+def session_database(session: AsyncSession) -> str:
+    return session.info.get("replica", "primary")
+
+
+def sibling_session(session: AsyncSession) -> AsyncSession:
+    """A new session on the same database (primary or replica) as ``session``."""
+    for replica in replicas:
+        if replica.name == session.info.get("replica"):
+            sibling = replica.sessionmaker()
+            sibling.info["replica"] = replica.name
+            return sibling
+    return async_session()
+
+
+def database_stats() -> dict:
+    return {
+        "pools": {name: stats.stats() for name, stats in pool_stats.items()},
+        "primary_reads": primary_reads,
+        "replicas": {replica.name: replica.stats() for replica in replicas},
+    }
+
+
+async def _yield_session(session: AsyncSession):
     try:
         async with session:
             yield session
@@ -27,3 +326,56 @@ async def get_db() -> AsyncSession:
         raise
     finally:
         await session.close()
+
+
+# Dependency to get the database session
+async def get_db(request: Request) -> AsyncSession:
+    if replicas and request.method not in ("GET", "HEAD", "OPTIONS"):
+        # Read-after-write: this client's next reads must not hit a replica that lacks the write.
+        # The cookie goes on in ReadAfterWriteMiddleware, which also sees Responses a route builds itself
+        setattr(request.state, PRIMARY_STICKY_STATE, time.time() + settings.DB_READ_AFTER_WRITE_SECONDS)
+    async for session in _yield_session(async_session()):
+        yield session
+
+
+def _sticky_cookie(until: float) -> str:
+    response = Response()
+    response.set_cookie(
+        PRIMARY_STICKY_COOKIE, f"{until:.0f}", max_age=int(settings.DB_READ_AFTER_WRITE_SECONDS) + 1,
+        httponly=True, samesite="lax",
+    )
+    return response.headers["set-cookie"]
+
+
+class ReadAfterWriteMiddleware:
+    """Sets the primary-sticky cookie on every response to a request that took a get_db session."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message: Message):
+            if message["type"] == "http.response.start":
+                until = scope.get("state", {}).get(PRIMARY_STICKY_STATE)
+                if until is not None:
+                    MutableHeaders(scope=message).append("set-cookie", _sticky_cookie(until))
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
+
+
+def _sticky(request: Request) -> bool:
+    try:
+        return float(request.cookies.get(PRIMARY_STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+# Dependency for read-only routes; load-balanced across replicas when DATABASE_REPLICA_URLS is set
+async def get_read_db(request: Request) -> AsyncSession:
+    async for session in _yield_session(read_session(sticky=_sticky(request))):
+        yield session
@@ -0,0 +1,70 @@
+import asyncio
+from typing import List
+from sqlalchemy import select, func, update, insert
+from sqlalchemy.exc import IntegrityError
+from app.core.database import engine
+from app.core.logging import logging
+from app.models.id_sequences import IdSequence
+
+
+class HiLoIdAllocator:
+    """Hands out public ids like ``blog_42`` from blocks reserved in ``id_sequences``.
+
+    Each worker reserves ``block_size`` numbers at a time with a single atomic
+    ``UPDATE ... RETURNING`` on its own short transaction, then serves ids from
+    memory. Concurrent workers never receive overlapping blocks, and inserts
+    need no extra query until the local block runs out. Ids are unique and
+    increasing per worker but not gap-free across workers.
+    """
+
+    def __init__(self, name: str, prefix: str, seed_column, block_size: int = 50):
+        self.name = name
+        self.prefix = prefix
+        self.seed_column = seed_column
+        self.block_size = block_size
+        self._next = 0
+        self._limit = 0
+        self._lock = asyncio.Lock()
+
+    async def next_id(self) -> str:
+        return (await self.next_ids(1))[0]
+
+    async def next_ids(self, count: int) -> List[str]:
+        async with self._lock:
+            numbers = []
+            while len(numbers) < count:
+                if self._next >= self._limit:
+                    await self._reserve_block(max(self.block_size, count - len(numbers)))
+                take = min(count - len(numbers), self._limit - self._next)
+                numbers.extend(range(self._next, self._next + take))
+                self._next += take
+        return [f"{self.prefix}_{number}" for number in numbers]
+
+    async def _reserve_block(self, size: int):
+        async with engine.begin() as conn:
+            end = await conn.scalar(
+                update(IdSequence)
+                .where(IdSequence.name == self.name)
+                .values(next_value=IdSequence.next_value + size)
+                .returning(IdSequence.next_value)
+            )
+            if end is None:
+                end = await self._create_sequence(conn, size)
+        self._next, self._limit = end - size, end
+        logging.info(f"Reserved {self.name} ids {self._next}..{self._limit - 1}")
+
+    async def _create_sequence(self, conn, size: int) -> int:
+        # Databases created without the migration: continue after the highest existing id
+        start = (await conn.scalar(select(func.coalesce(func.max(self.seed_column), 0)))) + 1
+        try:
+            async with conn.begin_nested():
+                await conn.execute(insert(IdSequence).values(name=self.name, next_value=start + size))
+            return start + size
+        except IntegrityError:
+            # Another worker created the row first; take a block from it instead
+            return await conn.scalar(
+                update(IdSequence)
+                .where(IdSequence.name == self.name)
+                .values(next_value=IdSequence.next_value + size)
+                .returning(IdSequence.next_value)
+            )
@@ -0,0 +1,41 @@
+import json
+from typing import Any, Iterable, List, Type
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, TypeAdapter
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional, stdlib json is the fallback
+    orjson = None
+
+
+def _default(value: Any):
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    return jsonable_encoder(value)
+
+
+def json_dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default)
+    return json.dumps(
+        jsonable_encoder(content), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """App-wide default response class rendering with orjson when it is installed."""
+
+    def render(self, content: Any) -> bytes:
+        return json_dumps(content)
+
+
+class BulkSerializer:
+    """Precompiled validator/serializer turning a list of ORM rows into plain dicts in one call."""
+
+    def __init__(self, model: Type[BaseModel]):
+        self.adapter = TypeAdapter(List[model])
+
+    def __call__(self, rows: Iterable[Any]) -> List[dict]:
+        return self.adapter.dump_python(self.adapter.validate_python(list(rows), from_attributes=True))
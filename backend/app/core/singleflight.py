@@ -0,0 +1,64 @@
+import asyncio
+import functools
+from typing import Any, Awaitable, Callable, Dict
+from app.core.database import session_database, sibling_session
+
+
+class SingleFlight:
+    """Coalesce concurrent identical async calls into one in-flight execution.
+
+    Callers that arrive while a call with the same key is running await the
+    leader's result (or exception) instead of issuing their own query.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        self.calls += 1
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.executions += 1
+            task = asyncio.ensure_future(func())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        # Shield so a disconnecting caller does not cancel the query for everyone else
+        return await asyncio.shield(task)
+
+    def coalesce(self, name: str):
+        """Decorate a service function taking ``db`` first; calls only merge when they read the same database.
+
+        The shared execution runs on a session of its own (same database as the
+        caller's), so a leader's request finishing or failing does not close the
+        session the followers are waiting on. Sessions pinned to the primary after
+        a write never merge: the leader may be reading a replica that does not have
+        the write yet.
+        """
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(db, *args, **kwargs):
+                if db.info.get("primary_pinned"):
+                    return await func(db, *args, **kwargs)
+                key = f"{name}:{session_database(db)}:{args!r}:{sorted(kwargs.items())!r}"
+
+                async def run():
+                    async with sibling_session(db) as session:
+                        return await func(session, *args, **kwargs)
+
+                return await self.do(key, run)
+            return wrapper
+        return decorator
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._in_flight),
+        }
@@ -0,0 +1,317 @@
+import base64
+import functools
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+from app.core.config import MEDIA_DIR, settings
+from app.utils.media_keys import is_content_addressed
+
+# Hashed names never change content, so browsers and CDNs may keep them for a year
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class LocalStorage:
+    """Media kept in a local directory (MEDIA_DIR by default) and served by the /media mount.
+
+    All methods block; async callers run them in the threadpool.
+    """
+
+    local = True
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    def path(self, key: str) -> Path:
+        return self.root / key
+
+    def staging_dir(self) -> str:
+        # Same filesystem as the final location, so put_file is an atomic rename
+        staging = self.root / ".tmp"
+        os.makedirs(staging, exist_ok=True)
+        return str(staging)
+
+    def size(self, key: str) -> Optional[int]:
+        try:
+            return os.stat(self.path(key)).st_size
+        except FileNotFoundError:
+            return None
+
+    def exists(self, key: str) -> bool:
+        return self.size(key) is not None
+
+    def modified(self, key: str) -> Optional[float]:
+        try:
+            return os.stat(self.path(key)).st_mtime
+        except FileNotFoundError:
+            return None
+
+    def put_file(self, key: str, source: str, content_type: str, overwrite: bool = True) -> bool:
+        """Move ``source`` to ``key``; returns False (and drops ``source``) if it exists and overwrite is off."""
+        destination = self.path(key)
+        if not overwrite and destination.exists():
+            os.remove(source)
+            # Touch the kept object so the media GC's grace period starts over
+            os.utime(destination)
+            return False
+        os.makedirs(destination.parent, exist_ok=True)
+        os.replace(source, destination)
+        return True
+
+    def read_range(self, key: str, start: int, length: int) -> bytes:
+        with open(self.path(key), "rb") as file:
+            return os.pread(file.fileno(), length, start)
+
+    def read(self, key: str) -> Optional[bytes]:
+        try:
+            return self.path(key).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    @contextmanager
+    def local_copy(self, key: str) -> Iterator[str]:
+        path = self.path(key)
+        if not path.is_file():
+            raise FileNotFoundError(key)
+        yield str(path)
+
+    def delete(self, key: str):
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def delete_prefix(self, prefix: str):
+        shutil.rmtree(self.path(prefix), ignore_errors=True)
+
+    def move(self, key: str, destination: str):
+        target = self.path(destination)
+        os.makedirs(target.parent, exist_ok=True)
+        os.replace(self.path(key), target)
+
+    def iter_keys(self, start_after: Optional[str] = None,
+                  exclude: Tuple[str, ...] = ()) -> Iterator[Tuple[str, int, float]]:
+        """Yield (key, size, mtime) for every file, depth first in sorted order, resuming after ``start_after``.
+
+        Keys are ordered by their path components, so whole directories that
+        sort before ``start_after`` are skipped without being listed. Top-level
+        directories named in ``exclude`` are never entered.
+        """
+        resume: List[str] = start_after.split("/") if start_after else []
+
+        def walk(directory: Path, parts: List[str]):
+            try:
+                entries = sorted(os.scandir(directory), key=lambda entry: entry.name)
+            except FileNotFoundError:
+                return
+            for entry in entries:
+                entry_parts = parts + [entry.name]
+                if entry.is_dir(follow_symlinks=False):
+                    if resume and entry_parts < resume[:len(entry_parts)]:
+                        continue
+                    if not parts and entry.name in exclude:
+                        continue
+                    yield from walk(Path(entry.path), entry_parts)
+                elif entry.is_file(follow_symlinks=False):
+                    if resume and entry_parts <= resume:
+                        continue
+                    try:
+                        stat_result = entry.stat(follow_symlinks=False)
+                    except FileNotFoundError:
+                        continue
+                    yield "/".join(entry_parts), stat_result.st_size, stat_result.st_mtime
+
+        yield from walk(self.root, [])
+
+    def presigned_get(self, key: str, expires: int) -> Optional[str]:
+        # Served directly by the API's /media mount
+        return None
+
+    def presigned_put(self, key: str, content_type: str, sha256: str, size: int, expires: int) -> Optional[dict]:
+        return None
+
+
+class S3Storage:
+    """Media in an S3-compatible bucket; requires the optional ``boto3`` package.
+
+    ``endpoint_url`` points it at a stand-in such as MinIO or moto for local runs.
+    Credentials come from the standard AWS environment/config chain.
+    """
+
+    local = False
+
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: Optional[str] = None,
+                 region: Optional[str] = None, public_url: Optional[str] = None):
+        import boto3
+        from boto3.s3.transfer import TransferConfig
+        from botocore.config import Config
+        self.bucket = bucket
+        self.prefix = prefix.strip("/") + "/" if prefix.strip("/") else ""
+        self.public_url = public_url.rstrip("/") if public_url else None
+        self._client = boto3.client(
+            "s3", endpoint_url=endpoint_url, region_name=region,
+            config=Config(signature_version="s3v4", max_pool_connections=32),
+        )
+        # Objects above the threshold are sent as concurrent multipart uploads
+        self._transfer = TransferConfig(
+            multipart_threshold=settings.MEDIA_S3_MULTIPART_THRESHOLD,
+            multipart_chunksize=settings.MEDIA_S3_MULTIPART_THRESHOLD,
+        )
+        self._staging = tempfile.mkdtemp(prefix="media-staging-")
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    def staging_dir(self) -> str:
+        os.makedirs(self._staging, exist_ok=True)
+        return self._staging
+
+    def size(self, key: str) -> Optional[int]:
+        from botocore.exceptions import ClientError
+        try:
+            return self._client.head_object(Bucket=self.bucket, Key=self._key(key))["ContentLength"]
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+    def exists(self, key: str) -> bool:
+        return self.size(key) is not None
+
+    def modified(self, key: str) -> Optional[float]:
+        from botocore.exceptions import ClientError
+        try:
+            return self._client.head_object(Bucket=self.bucket, Key=self._key(key))["LastModified"].timestamp()
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+    def put_file(self, key: str, source: str, content_type: str, overwrite: bool = True) -> bool:
+        try:
+            if not overwrite and self.exists(key):
+                return False
+            extra = {"ContentType": content_type}
+            if is_content_addressed(key):
+                extra["CacheControl"] = IMMUTABLE_CACHE_CONTROL
+            self._client.upload_file(source, self.bucket, self._key(key), ExtraArgs=extra, Config=self._transfer)
+            return True
+        finally:
+            os.remove(source)
+
+    def read_range(self, key: str, start: int, length: int) -> bytes:
+        response = self._client.get_object(
+            Bucket=self.bucket, Key=self._key(key), Range=f"bytes={start}-{start + length - 1}"
+        )
+        return response["Body"].read()
+
+    def read(self, key: str) -> Optional[bytes]:
+        from botocore.exceptions import ClientError
+        try:
+            return self._client.get_object(Bucket=self.bucket, Key=self._key(key))["Body"].read()
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+    @contextmanager
+    def local_copy(self, key: str) -> Iterator[str]:
+        fd, path = tempfile.mkstemp(dir=self.staging_dir())
+        os.close(fd)
+        try:
+            self._client.download_file(self.bucket, self._key(key), path, Config=self._transfer)
+            yield path
+        finally:
+            os.remove(path)
+
+    def delete(self, key: str):
+        self._client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+    def delete_prefix(self, prefix: str):
+        paginator = self._client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self._key(prefix)):
+            objects = [{"Key": item["Key"]} for item in page.get("Contents", [])]
+            if objects:
+                self._client.delete_objects(Bucket=self.bucket, Delete={"Objects": objects, "Quiet": True})
+
+    def move(self, key: str, destination: str):
+        self._client.copy_object(
+            Bucket=self.bucket, Key=self._key(destination), CopySource={"Bucket": self.bucket, "Key": self._key(key)}
+        )
+        self.delete(key)
+
+    def iter_keys(self, start_after: Optional[str] = None,
+                  exclude: Tuple[str, ...] = ()) -> Iterator[Tuple[str, int, float]]:
+        """Yield (key, size, mtime) in the bucket's listing order, resuming after ``start_after``.
+
+        On reaching a top-level directory named in ``exclude`` the listing starts
+        over past it, so its objects are not paged through.
+        """
+        while True:
+            options = {"Bucket": self.bucket, "Prefix": self.prefix}
+            if start_after:
+                options["StartAfter"] = self._key(start_after)
+            skip_to = None
+            for page in self._client.get_paginator("list_objects_v2").paginate(**options):
+                for item in page.get("Contents", []):
+                    key = item["Key"][len(self.prefix):]
+                    directory, separator, _ = key.partition("/")
+                    if separator and directory in exclude:
+                        # "0" sorts right after "/", so this resumes after everything under directory/
+                        skip_to = f"{directory}0"
+                        break
+                    yield key, item["Size"], item["LastModified"].timestamp()
+                if skip_to is not None:
+                    break
+            if skip_to is None:
+                return
+            start_after = skip_to
+
+    def presigned_get(self, key: str, expires: int) -> Optional[str]:
+        if self.public_url:
+            return f"{self.public_url}/{self._key(key)}"
+        return self._client.generate_presigned_url(
+            "get_object", Params={"Bucket": self.bucket, "Key": self._key(key)}, ExpiresIn=expires
+        )
+
+    def presigned_put(self, key: str, content_type: str, sha256: str, size: int, expires: int) -> Optional[dict]:
+        """URL and headers for a direct client upload; S3 rejects a body whose sha256 or length differ."""
+        checksum = base64.b64encode(bytes.fromhex(sha256)).decode()
+        params = {
+            "Bucket": self.bucket, "Key": self._key(key), "ContentType": content_type,
+            "ContentLength": size, "ChecksumSHA256": checksum,
+        }
+        if is_content_addressed(key):
+            params["CacheControl"] = IMMUTABLE_CACHE_CONTROL
+        url = self._client.generate_presigned_url("put_object", Params=params, ExpiresIn=expires)
+        headers = {"Content-Type": content_type, "Content-Length": str(size), "x-amz-checksum-sha256": checksum}
+        if "CacheControl" in params:
+            headers["Cache-Control"] = params["CacheControl"]
+        return {"method": "PUT", "url": url, "headers": headers}
+
+
+@functools.lru_cache(maxsize=None)
+def get_media_storage(url: Optional[str]):
+    """Build the backend for MEDIA_STORAGE_URL: unset or file://<dir> for local disk, s3://bucket/prefix for S3."""
+    if not url:
+        return LocalStorage(MEDIA_DIR)
+    parsed = urlparse(url)
+    if parsed.scheme == "file":
+        return LocalStorage(Path(parsed.path) if parsed.path else MEDIA_DIR)
+    if parsed.scheme == "s3":
+        options = {name: values[-1] for name, values in parse_qs(parsed.query).items()}
+        return S3Storage(
+            bucket=parsed.netloc,
+            prefix=parsed.path,
+            endpoint_url=options.get("endpoint") or settings.MEDIA_S3_ENDPOINT_URL,
+            region=options.get("region") or settings.MEDIA_S3_REGION,
+            public_url=options.get("public_url") or settings.MEDIA_S3_PUBLIC_URL,
+        )
+    # Unlike the cache, silently falling back to local disk would split media across nodes
+    raise RuntimeError(f"Unsupported MEDIA_STORAGE_URL scheme: {url}")
+
+
+media_storage = get_media_storage(settings.MEDIA_STORAGE_URL)
@@ -1,4 +1,3 @@
-from fastapi.staticfiles import StaticFiles
 from app.core.config import settings, MEDIA_DIR
 import os
 import logging
@@ -12,18 +11,36 @@ from sqlalchemy import text
 from app.routers.categories import router
 from app.models.categories import *
 from app.core.logging import logging
-from app.routers import categories, subcategories, blog
+from app.core.cache import blog_detail_cache
+from app.core.database import ReadAfterWriteMiddleware, database_stats, start_replica_monitor, stop_replica_monitor
+from app.core.responses import FastJSONResponse
+from app.core.compression import CompressionMiddleware, compression_stats
+from app.core.upload_limits import UploadSizeLimitMiddleware
+from app.services.blog import blog_reads
+from app.services.media_derivatives import derivative_stats, shutdown_derivative_pool
+from app.services.media_gc import media_gc_stats, start_media_gc, stop_media_gc
+from app.services.taxonomy import load_taxonomy, taxonomy
+from app.services.typeahead import taxonomy_typeahead
+from app.core.storage import media_storage
+from app.utils.media_files import MediaFiles, media_fd_cache
+from app.routers import categories, subcategories, blog, typeahead
 from app.utils.send_notifications.send_notifications import router as notification_router
 
 
-app = FastAPI(title="FastAPI Blog Application", docs_url="/api_v1/docs", redoc_url="/api_v1/redoc")
+app = FastAPI(
+    title="FastAPI Blog Application",
+    docs_url="/api_v1/docs",
+    redoc_url="/api_v1/redoc",
+    default_response_class=FastJSONResponse,
+)
 
-# Mount media files directory
-app.mount("/media", StaticFiles(directory=MEDIA_DIR), name="media")
+# Mount media files (served from local disk, or redirected to the object store)
+app.mount("/media", MediaFiles(directory=media_storage.root if media_storage.local else MEDIA_DIR), name="media")
 
 app.include_router(categories.router, prefix="/api/categories", tags=["categories"])
 app.include_router(subcategories.router, prefix="/api/subcategories", tags=["Subcategories"])
 app.include_router(blog.router, prefix="/api/blog", tags=["blog"])
+app.include_router(typeahead.router, prefix="/api/typeahead", tags=["typeahead"])
 app.include_router(notification_router, prefix="/api/notifications", tags=["Notifications"])
 
 
@@ -31,10 +48,18 @@ app.include_router(notification_router, prefix="/api/notifications", tags=["Noti
 @app.on_event("startup")
 async def startup_event():
     logging.info("Application startup application...")
+    await start_replica_monitor()
+    await load_taxonomy()
+    blog_detail_cache.start_listener()
+    start_media_gc()
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logging.info("Shutting down application...")
+    shutdown_derivative_pool()
+    await stop_media_gc()
+    await blog_detail_cache.stop_listener()
+    await stop_replica_monitor()
     
 app.add_middleware(
     CORSMiddleware,
@@ -44,6 +69,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(ReadAfterWriteMiddleware)
+
+app.add_middleware(UploadSizeLimitMiddleware, max_body_size=settings.MAX_UPLOAD_SIZE + settings.MAX_UPLOAD_FORM_OVERHEAD)
+
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MIN_SIZE,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+    zstd_level=settings.COMPRESSION_ZSTD_LEVEL,
+    exclude_paths=("/media",),
+)
+
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -52,4 +90,18 @@ if __name__ == "__main__":
 async def health_check():
     return {"status": "ok"}
 
+@app.get("/metrics")
+async def metrics():
+    return {
+        "blog_detail_cache": blog_detail_cache.stats(),
+        "blog_reads_singleflight": blog_reads.stats(),
+        "compression": compression_stats.stats(),
+        "database": database_stats(),
+        "image_derivatives": derivative_stats.stats(),
+        "media_fd_cache": media_fd_cache.stats(),
+        "media_gc": media_gc_stats.stats(),
+        "taxonomy": taxonomy.stats(),
+        "taxonomy_typeahead": taxonomy_typeahead.stats(),
+    }
+
 
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Boolean, DateTime, Integer, Text, func, ForeignKey
+from sqlalchemy import Column, String, Boolean, DateTime, Integer, Text, func, ForeignKey, Index, DDL, event
 from app.core.database import Base
 from sqlalchemy.orm import relationship
 
@@ -22,3 +22,72 @@ class Blog(Base):
 
     def __repr__(self):
         return f"<Blog {self.title} (ID: {self.blog_id}) created on {self.created_on}>"
+
+
+# Indexes for the service queries (see benchmarks/explain_queries.py). The partial ones cover
+# only active rows, matching the Blog.is_active == True filter every listing applies.
+_active = Blog.is_active == True
+# Listing ordered by id, and the active count (index-only)
+Index("ix_blog_active_id", Blog.id, postgresql_where=_active, sqlite_where=_active)
+# Keyset pagination on (created_on, id), both directions
+Index("ix_blog_active_created_on_id", Blog.created_on, Blog.id, postgresql_where=_active, sqlite_where=_active)
+# Active blogs of a subcategory ordered by id
+Index("ix_blog_subcategory_active_id", Blog.subcategory_id, Blog.id, postgresql_where=_active, sqlite_where=_active)
+# Subcategory join and the per-subcategory active/total counts
+Index("ix_blog_subcategory_id_is_active", Blog.subcategory_id, Blog.is_active)
+# Incremental export: coalesce(updated_on, created_on) >= since
+Index("ix_blog_modified_on", func.coalesce(Blog.updated_on, Blog.created_on))
+# Media GC reference lookups by stored file name
+_has_image = Blog.image.is_not(None)
+Index("ix_blog_image", Blog.image, postgresql_where=_has_image, sqlite_where=_has_image)
+
+
+# Full-text search (app/services/blog_search.py). Neither structure is mapped on Blog, so the
+# ORM never loads or writes them; the same DDL is applied to existing databases by migration.
+SEARCH_CONFIG = "english"
+# PostgreSQL: a generated tsvector, title weighted A and content B, with a GIN index
+POSTGRES_SEARCH_DDL = [
+    "ALTER TABLE blog ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(content, '')), 'B')) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_blog_search_vector ON blog USING gin (search_vector)",
+    # Typeahead (app/services/typeahead.py): title prefixes as a range scan in byte order (COLLATE "C",
+    # whatever the database collation), and fuzzy matches nearest first by trigram distance
+    'CREATE INDEX IF NOT EXISTS ix_blog_title_prefix ON blog (lower(title) COLLATE "C") WHERE is_active = true',
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_blog_title_trgm ON blog USING gist (lower(title) gist_trgm_ops) WHERE is_active = true",
+]
+# SQLite: an external-content FTS5 table over blog, kept in step by triggers
+SQLITE_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS blog_fts USING fts5("
+    "title, content, content='blog', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS blog_fts_insert AFTER INSERT ON blog BEGIN "
+    "INSERT INTO blog_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END",
+    "CREATE TRIGGER IF NOT EXISTS blog_fts_delete AFTER DELETE ON blog BEGIN "
+    "INSERT INTO blog_fts(blog_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); END",
+    "CREATE TRIGGER IF NOT EXISTS blog_fts_update AFTER UPDATE OF title, content ON blog BEGIN "
+    "INSERT INTO blog_fts(blog_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); "
+    "INSERT INTO blog_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END",
+    "INSERT INTO blog_fts(blog_fts) VALUES ('rebuild')",
+    # Typeahead: title prefixes (SQLite compares text bytewise already), and a trigram-tokenized
+    # FTS5 table over titles for fuzzy matches
+    "CREATE INDEX IF NOT EXISTS ix_blog_title_prefix ON blog (lower(title)) WHERE is_active = 1",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS blog_title_trgm USING fts5("
+    "title, content='blog', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS blog_title_trgm_insert AFTER INSERT ON blog BEGIN "
+    "INSERT INTO blog_title_trgm(rowid, title) VALUES (new.id, new.title); END",
+    "CREATE TRIGGER IF NOT EXISTS blog_title_trgm_delete AFTER DELETE ON blog BEGIN "
+    "INSERT INTO blog_title_trgm(blog_title_trgm, rowid, title) VALUES ('delete', old.id, old.title); END",
+    "CREATE TRIGGER IF NOT EXISTS blog_title_trgm_update AFTER UPDATE OF title ON blog BEGIN "
+    "INSERT INTO blog_title_trgm(blog_title_trgm, rowid, title) VALUES ('delete', old.id, old.title); "
+    "INSERT INTO blog_title_trgm(rowid, title) VALUES (new.id, new.title); END",
+    "INSERT INTO blog_title_trgm(blog_title_trgm) VALUES ('rebuild')",
+]
+
+for _statement in POSTGRES_SEARCH_DDL:
+    event.listen(Blog.__table__, "after_create", DDL(_statement).execute_if(dialect="postgresql"))
+for _statement in SQLITE_SEARCH_DDL:
+    event.listen(Blog.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+# The FTS5 tables are not in the metadata, so drop_all would leave them behind
+for _table in ("blog_fts", "blog_title_trgm"):
+    event.listen(Blog.__table__, "after_drop", DDL(f"DROP TABLE IF EXISTS {_table}").execute_if(dialect="sqlite"))
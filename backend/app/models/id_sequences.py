@@ -0,0 +1,15 @@
+from sqlalchemy import Column, String, BigInteger
+from app.core.database import Base
+
+
+class IdSequence(Base):
+    __tablename__ = 'id_sequences'
+
+    # One row per public id namespace ("blog", "cat", "subcat"); next_value is the
+    # first number not yet handed out to any worker. The "taxonomy" row is a version
+    # counter instead, bumped on every category/subcategory write
+    name = Column(String(50), primary_key=True)
+    next_value = Column(BigInteger, nullable=False)
+
+    def __repr__(self):
+        return f"<IdSequence {self.name} next={self.next_value}>"
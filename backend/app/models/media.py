@@ -0,0 +1,19 @@
+from sqlalchemy import Column, String, Integer, BigInteger, DateTime, func
+from app.core.database import Base
+
+
+class MediaObject(Base):
+    __tablename__ = 'media_objects'
+
+    # Content-addressed file stored at media/<key>, where key is ab/cd/<sha256>.<ext>;
+    # ref_count is the number of rows pointing at it, 0 means it may be collected
+    sha256 = Column(String(64), primary_key=True)
+    key = Column(String(255), nullable=False, unique=True)
+    content_type = Column(String(50), nullable=False)
+    size = Column(BigInteger, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_on = Column(DateTime, default=func.now(), nullable=False)
+    updated_on = Column(DateTime, default=func.now(), onupdate=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<MediaObject {self.key} refs={self.ref_count}>"
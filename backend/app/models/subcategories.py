@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Boolean, DateTime, Integer, func, ForeignKey
+from sqlalchemy import Column, String, Boolean, DateTime, Integer, func, ForeignKey, Index
 from app.core.database import Base
 from sqlalchemy.orm import relationship
 
@@ -19,3 +19,9 @@ class Subcategory(Base):
 
     def __repr__(self):
         return f"<Subcategory {self.name} (ID: {self.subcat_id}) created on {self.created_on}>"
+
+
+# Active subcategories of a category
+_active = Subcategory.is_active == True
+Index("ix_subcategories_category_active_id", Subcategory.category_id, Subcategory.id,
+      postgresql_where=_active, sqlite_where=_active)
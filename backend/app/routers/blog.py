@@ -1,7 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, status, Query,Request
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+import csv
+import io
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.services.blog import *
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db
 from app.schemas.blog import *
 from typing import Optional
 from pathlib import Path
@@ -10,7 +14,14 @@ import os
 import uuid
 from app.core.logging import logging
 from datetime import datetime
-from app.core.config import MEDIA_DIR
+from app.core.config import MEDIA_DIR, settings
+from app.services.blog_import import import_blogs
+from app.services.blog_search import search_blogs
+from app.services.media import save_upload, presign_upload, verify_direct_upload
+from app.services.media_derivatives import derivative_urls, schedule_derivatives
+from app.utils.fieldsets import resolve_fields, VIEW_FULL
+from app.utils.conditional import conditional_json_response
+from app.core.responses import FastJSONResponse, json_dumps
 
 router = APIRouter()
 
@@ -24,34 +35,29 @@ async def create_blog_api(
     content: str = Form(...),
     is_active: Optional[bool] = Form(True),
     image: Optional[UploadFile] = File(None),
+    image_key: Optional[str] = Form(None, description="Key returned by /uploads/presign after a direct upload"),
     db: AsyncSession = Depends(get_db),
 ):
     try:
-        new_blog_id = await generate_blog_id(db)
-        image_path = None
+        stored_image = None
         if image:
-            image_extension = image.filename.split(".")[-1]
-            original_filename = os.path.splitext(image.filename)[0]
-            image_filename = f"{new_blog_id}_{
-                original_filename}.{image_extension}"
-            image_path = image_filename
+            # Streamed to a temp file off the event loop, then stored under its content hash
+            stored_image = await save_upload(image)
+        elif image_key:
+            stored_image = await verify_direct_upload(db, image_key)
 
-            # Save the image to the media directory
-            os.makedirs(MEDIA_DIR, exist_ok=True)
-            full_image_path = os.path.join(MEDIA_DIR, image_filename)
-            with open(full_image_path, "wb") as buffer:
-                shutil.copyfileobj(image.file, buffer)
-
-            logging.info(f"Image saved at: {full_image_path}")
-
-        # Create the blog entry with the generated blog ID
+        # Create the blog entry; a failed insert leaves the object unreferenced for collection
         new_blog = await create_blog(db, {
             "category_id": category_id,
             "subcategory_id": subcategory_id,
             "title": title,
             "content": content,
             "is_active": is_active,
-        }, image_path=image_path)
+        }, image=stored_image)
+
+        # Thumbnails and WebP/AVIF copies are rendered in the background, once per stored object
+        if stored_image and stored_image.created:
+            schedule_derivatives(stored_image.key)
 
         # Dynamically get the base URL and construct the media URL
         base_url = str(request.base_url)
@@ -65,6 +71,7 @@ async def create_blog_api(
             title=new_blog.title,
             content=new_blog.content,
             image=f"{base_url}media/{new_blog.image}" if new_blog.image else None,
+            image_derivatives=derivative_urls(base_url, new_blog.image),
             is_active=new_blog.is_active,
             created_on=new_blog.created_on,
             updated_on=new_blog.updated_on,
@@ -80,89 +87,224 @@ async def create_blog_api(
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,detail=f"An unexpected error occurred: {str(exc)}")
         
 
+@router.post("/uploads/presign", response_model=dict, summary="Sign a direct image upload to media storage")
+async def presign_image_upload_api(upload: ImageUploadRequestModel):
+    try:
+        # Signing may need a round trip to the object store (existence check)
+        result = await run_in_threadpool(presign_upload, upload.sha256, upload.content_type, upload.size)
+        logging.info(f"Presigned image upload for {result['key']} (already stored: {result['upload'] is None}).")
+        return FastJSONResponse({
+            "status_code": 200,
+            "message": "Image already stored" if result["upload"] is None else "Upload URL created",
+            "data": result
+        })
+    except HTTPException as http_exc:
+        logging.error(f"HTTP error while presigning upload: {str(http_exc.detail)}")
+        raise http_exc
+    except Exception as exc:
+        logging.error(f"Unexpected error while presigning upload: {str(exc)}", exc_info=True)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to presign upload")
+
+
+@router.post("/import", response_model=dict, summary="Bulk import Blogs from NDJSON or CSV")
+async def import_blogs_api(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(ndjson|csv)$"),
+    chunk_size: int = Query(settings.IMPORT_CHUNK_SIZE, gt=0, le=settings.IMPORT_MAX_CHUNK_SIZE),
+    db: AsyncSession = Depends(get_db)
+):
+    try:
+        # Fall back to the Content-Type when no explicit format is given
+        data_format = format or ("csv" if "csv" in request.headers.get("content-type", "") else "ndjson")
+
+        # The body is consumed as a stream and imported chunk by chunk
+        report = await import_blogs(db, request.stream(), data_format, chunk_size)
+
+        logging.info(f"Blog import processed {len(report['results'])} rows.")
+        return {
+            "status_code": 200,
+            "message": "Blog import completed",
+            "created": report["counts"]["created"],
+            "skipped": report["counts"]["skipped"],
+            "failed": report["counts"]["error"],
+            "results": report["results"]
+        }
+    except HTTPException as http_exc:
+        logging.error(f"HTTP error while importing blogs: {str(http_exc.detail)}")
+        raise http_exc
+    except Exception as exc:
+        logging.error(f"Unexpected error during blog import: {str(exc)}", exc_info=True)
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to import blogs")
+
+
+@router.get("/export", summary="Stream all Blog Details as NDJSON or CSV")
+async def export_blogs_api(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    since: Optional[datetime] = Query(None, description="Only blogs created or updated at or after this time"),
+    include_inactive: bool = Query(False)
+):
+    # Dynamically get the base URL and construct the media URL
+    base_url = str(request.base_url)
+
+    def export_row(row) -> dict:
+        item = dict(row)
+        if item["blog_image"]:
+            item["blog_image"] = f"{base_url}media/{item['blog_image']}"
+        return item
+
+    async def ndjson_rows():
+        async for row in stream_blog_export(since, include_inactive):
+            yield json_dumps(export_row(row)) + b"\n"
+
+    async def csv_rows():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(BLOG_DETAIL_FIELDS)
+        async for row in stream_blog_export(since, include_inactive):
+            item = export_row(row)
+            writer.writerow([
+                item[field].isoformat() if isinstance(item[field], datetime) else item[field]
+                for field in BLOG_DETAIL_FIELDS
+            ])
+            # Flush each row to the client as soon as it is produced
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+
+    logging.info(f"Starting blog export as {format} (since={since}, include_inactive={include_inactive}).")
+    if format == "csv":
+        return StreamingResponse(csv_rows(), media_type="text/csv",
+                                 headers={"Content-Disposition": 'attachment; filename="blogs.csv"'})
+    return StreamingResponse(ndjson_rows(), media_type="application/x-ndjson")
+
+
 @router.get("/all/", response_model=dict, summary="List of Blog Details")
 async def get_blog_details(
     request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(10, gt=0),
-    db: AsyncSession = Depends(get_db)
+    paginate: str = Query("offset", pattern="^(offset|cursor)$"),
+    cursor: Optional[str] = Query(None),
+    include_total: bool = Query(True),
+    fields: Optional[str] = Query(None, description="Comma separated list of fields to return"),
+    view: str = Query(VIEW_FULL, pattern="^(full|summary)$"),
+    db: AsyncSession = Depends(get_read_db)
 ):
     try:
-        blog_details, total_count = await get_all_blog_detail(db, skip=skip, limit=limit)
+        selected_fields = resolve_fields(fields, view, BLOG_DETAIL_FIELDS, BLOG_DETAIL_SUMMARY_FIELDS)
+        blog_details, total_count, next_cursor, prev_cursor = await get_all_blog_detail(
+            db, skip=skip, limit=limit, cursor=cursor, include_total=include_total,
+            use_cursor=paginate == "cursor", fields=selected_fields
+        )
 
         # Dynamically get the base URL and construct the media URL
         base_url = str(request.base_url)
 
         # Generate full URL for images
-        data = [
-            {
-                "category_id": category_id,
-                "category_name": category_name,
-                "subcategory_id": subcategory_id,
-                "subcategory_name": subcategory_name,
-                "id": id,
-                "blog_id": blog_id,
-                "blog_title": blog_title,
-                "blog_content": blog_content,
-                "blog_image": f"{base_url}media/{blog_image}" if blog_image else None,
-                "is_active": is_active,
-                "created_on": created_on,
-                "updated_on": updated_on
-            }
-            for category_id, category_name, subcategory_id, subcategory_name, id, blog_id, blog_title, blog_content, blog_image, is_active, created_on, updated_on in blog_details
-        ]
+        data = []
+        for blog_detail in blog_details:
+            item = {field: blog_detail[field] for field in selected_fields}
+            if "blog_image" in item:
+                item["blog_image_derivatives"] = derivative_urls(base_url, item["blog_image"])
+            if item.get("blog_image"):
+                item["blog_image"] = f"{base_url}media/{item['blog_image']}"
+            data.append(item)
 
         logging.info("Successfully retrieved all blog details.")
-        return {
+        return conditional_json_response(request, {
             "status_code": 200,
             "message": "Blog details retrieved successfully",
             "total_count": total_count,
+            "next_cursor": next_cursor,
+            "prev_cursor": prev_cursor,
             "data": data
-        }
+        })
+    except HTTPException as http_exc:
+        logging.error(f"HTTP error while fetching blog details: {str(http_exc.detail)}")
+        raise http_exc
     except Exception as e:
         logging.error(f"Failed to fetch blog details: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to fetch blog details")
         
         
+@router.get("/search", response_model=dict, summary="Full-text search over Blog titles and content")
+async def search_blogs_api(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    category_id: Optional[int] = Query(None),
+    subcategory_id: Optional[int] = Query(None),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(10, gt=0, le=100),
+    db: AsyncSession = Depends(get_read_db)
+):
+    try:
+        results, next_cursor = await search_blogs(
+            db, q, category_id=category_id, subcategory_id=subcategory_id, cursor=cursor, limit=limit
+        )
+
+        # Dynamically get the base URL and construct the media URL
+        base_url = str(request.base_url)
+
+        for item in results:
+            item["blog_image_derivatives"] = derivative_urls(base_url, item["blog_image"])
+            if item["blog_image"]:
+                item["blog_image"] = f"{base_url}media/{item['blog_image']}"
+
+        return conditional_json_response(request, {
+            "status_code": 200,
+            "message": "Blog search results retrieved successfully",
+            "next_cursor": next_cursor,
+            "data": results
+        })
+    except HTTPException as http_exc:
+        logging.error(f"HTTP error while searching blogs: {str(http_exc.detail)}")
+        raise http_exc
+    except Exception as e:
+        logging.error(f"Failed to search blogs: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to search blogs")
+
+
 @router.get("/{blog_detail_id}", response_model=dict, summary="Retrieve a Blog by ID")
 async def get_blog_by_id_route(
     request: Request,
     blog_detail_id: int,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     try:
         blog_detail = await get_blog_detail_by_id(db, blog_detail_id)
 
-        # Check if blog_detail is a dictionary and contains "status_code"
-        if isinstance(blog_detail, dict) and "status_code" in blog_detail:
-            return blog_detail
+        # Inactive blogs come back as a ready-made response
+        if "status_code" in blog_detail:
+            return conditional_json_response(request, blog_detail)
 
         # Dynamically get the base URL and construct the media URL
         base_url = str(request.base_url)
 
-        # If blog_detail is a Row object, manually construct response data
+        # blog_detail is the cached payload; build a fresh dict rather than mutating it
         if blog_detail:
             data = {
-                "category_id": blog_detail.category_id,
-                "category_name": blog_detail.category_name,
-                "subcategory_id": blog_detail.subcategory_id,
-                "subcategory_name": blog_detail.subcategory_name,
-                "id": blog_detail.id,
-                "blog_id": blog_detail.blog_id,
-                "blog_title": blog_detail.blog_title,
-                "blog_content": blog_detail.blog_content,
-                "blog_image": f"{base_url}media/{blog_detail.blog_image}" if blog_detail.blog_image else None,
-                "is_active": blog_detail.is_active,
-                "created_on": blog_detail.created_on,
-                "updated_on": blog_detail.updated_on
+                "category_id": blog_detail["category_id"],
+                "category_name": blog_detail["category_name"],
+                "subcategory_id": blog_detail["subcategory_id"],
+                "subcategory_name": blog_detail["subcategory_name"],
+                "id": blog_detail["id"],
+                "blog_id": blog_detail["blog_id"],
+                "blog_title": blog_detail["blog_title"],
+                "blog_content": blog_detail["blog_content"],
+                "blog_image": f"{base_url}media/{blog_detail['blog_image']}" if blog_detail["blog_image"] else None,
+                "blog_image_derivatives": derivative_urls(base_url, blog_detail["blog_image"]),
+                "is_active": blog_detail["is_active"],
+                "created_on": blog_detail["created_on"],
+                "updated_on": blog_detail["updated_on"]
             }
 
-            logging.info(f"Blog details retrieved: {blog_detail.blog_title}")
-            return {
+            logging.info(f"Blog details retrieved: {blog_detail['blog_title']}")
+            return conditional_json_response(request, {
                 "status_code": 200,
                 "message": "Blog detail retrieved successfully",
                 "data": data
-            }
+            })
         else:
             logging.warning(f"Blog with ID {blog_detail_id} not found.")
             raise HTTPException(status_code=404, detail=f"Blog with ID {blog_detail_id} not found")
@@ -185,6 +327,7 @@ async def update_blog_route(
     category_id: Optional[int] = Form(None),
     subcategory_id: Optional[int] = Form(None),
     new_image: UploadFile = File(None),
+    image_key: Optional[str] = Form(None, description="Key returned by /uploads/presign after a direct upload"),
     db: AsyncSession = Depends(get_db)
 ):
     existing_blog = await db.get(Blog, blog_detail_id)
@@ -201,7 +344,7 @@ async def update_blog_route(
         is_active=is_active
     )
 
-    updated_blog = await update_blog_details(db, blog_detail_id, blog_data, new_image)
+    updated_blog = await update_blog_details(db, blog_detail_id, blog_data, new_image, image_key=image_key)
 
     # Dynamically get the base URL and construct the media URL
     base_url = str(request.base_url)
@@ -214,6 +357,7 @@ async def update_blog_route(
         title=updated_blog.title,
         content=updated_blog.content,
         image=f"{base_url}media/{updated_blog.image}" if updated_blog.image else None,
+        image_derivatives=derivative_urls(base_url, updated_blog.image),
         is_active=updated_blog.is_active,
         created_on=updated_blog.created_on,
         updated_on=updated_blog.updated_on
@@ -245,15 +389,19 @@ async def delete_blog_detail_route(blogdetail_id: int, db: AsyncSession = Depend
 async def get_blogdetail_for_subcategory(
     request: Request,
     subcategory_id: int,
-    skip: int = 0,
-    limit: int = 10,
-    db: AsyncSession = Depends(get_db)
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, gt=0),
+    fields: Optional[str] = Query(None, description="Comma separated list of fields to return"),
+    view: str = Query(VIEW_FULL, pattern="^(full|summary)$"),
+    db: AsyncSession = Depends(get_read_db)
 ):
     try:
         logging.info(f"Fetching blog details for subcategory ID: {subcategory_id} with skip: {skip} and limit: {limit}.")
 
+        selected_fields = resolve_fields(fields, view, SUBCATEGORY_BLOG_FIELDS, SUBCATEGORY_BLOG_SUMMARY_FIELDS)
+
         # Fetch blog details for the subcategory
-        result = await get_blogdetail_by_subcategory_id(db, subcategory_id, skip, limit)
+        result = await get_blogdetail_by_subcategory_id(db, subcategory_id, skip, limit, fields=selected_fields)
 
         # Check if any blogs were found
         if not result["blogs"]:
@@ -267,7 +415,7 @@ async def get_blogdetail_for_subcategory(
         base_url = str(request.base_url)
 
         # Return the response with the blog details and subcategory info
-        return {
+        return conditional_json_response(request, {
             "status_code": 200,
             "message": "Subcategory and blog details retrieved successfully",
             "category_id": result["category_id"],
@@ -277,17 +425,15 @@ async def get_blogdetail_for_subcategory(
             "total_active_blogs": result["total_active_blogs"],
             "blogs": [
                 {
-                    "id": blog.id,
-                    "title": blog.title,
-                    "content": blog.content,
-                    "image": f"{base_url}media/{blog.image}" if blog.image else None,
-                    "is_active": blog.is_active,
-                    "created_on": blog.created_on,
-                    "updated_on": blog.updated_on
+                    **{
+                        field: (f"{base_url}media/{blog.image}" if blog.image else None) if field == "image" else getattr(blog, field)
+                        for field in selected_fields
+                    },
+                    **({"image_derivatives": derivative_urls(base_url, blog.image)} if "image" in selected_fields else {})
                 }
                 for blog in result["blogs"]
             ]
-        }
+        })
 
     except HTTPException as e:
         logging.error(f"HTTPException: {e.detail} (Subcategory ID: {subcategory_id})")
@@ -1,32 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.responses import JSONResponse
 from app.schemas.categories import CategoryModel, CategoryCreateModel, CategoryUpdateModel
 from app.services.categories import *
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db
 from app.core.logging import logger
 from typing import Dict, Any, Optional
+from app.core.responses import BulkSerializer
+from app.utils.conditional import conditional_json_response, version_etag
 
 router = APIRouter()
 
+# Precompiled bulk serializer for category lists
+serialize_categories = BulkSerializer(CategoryModel)
+
 @router.post("/", response_model=dict, summary="Create new Categories")
 async def create_category_route(
     category_data: CategoryCreateModel, db: AsyncSession = Depends(get_db)
 ):
     try:
-        existing_categories = await db.execute(select(Category.name).where(Category.name.in_(category_data.names)))
-        existing_names = existing_categories.scalars().all()
-        if existing_names:
+        new_categories, skipped_names = await create_category(db, category_data)
+        if not new_categories:
             raise HTTPException(
                 status_code=400,
-                detail=f"Category names already exist: {', '.join(existing_names)}"
+                detail=f"Category names already exist: {', '.join(skipped_names)}"
             )
-        new_categories = await create_category(db, category_data)
         logging.info(f"{len(new_categories)} categories created.")
         return {
             "status_code": 201,
             "message": "Categories created successfully",
-            "data": [CategoryModel.from_orm(cat) for cat in new_categories]
+            "skipped": skipped_names,
+            "data": serialize_categories(new_categories)
         }
     except HTTPException as he:
         logging.error(f"HTTP error: {he.detail}")
@@ -37,38 +41,40 @@ async def create_category_route(
 
 @router.get("/all/", response_model=dict, summary="List of categories")
 async def get_categories_route(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(10, gt=0),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     try:
         categories, total_count = await get_all_categories(db, skip=skip, limit=limit)
         logging.info("Successfully retrieved all categories.")
 
-        return {
+        return conditional_json_response(request, {
             "status_code": 200,
             "message": "Categories retrieved successfully",
             "total_count": total_count,
-            "data": [CategoryModel.from_orm(cat) for cat in categories]
-        }
+            "data": serialize_categories(categories)
+        })
     except Exception as e:
         logging.error(f"Failed to fetch categories: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail="Failed to fetch categories")
 
 
 @router.get("/{category_id}", response_model=dict, summary="Retrieve a Category by ID")
-async def get_category_by_id_route(category_id: int, db: AsyncSession = Depends(get_db)):
+async def get_category_by_id_route(request: Request, category_id: int, db: AsyncSession = Depends(get_read_db)):
     try:
         category = await get_category_by_id(db, category_id)
         if not category:
             raise HTTPException(status_code=404, detail="Category not found")
 
         logging.info(f"Category retrieved: {category.name}")
-        return {
+        last_modified = category.updated_on or category.created_on
+        return conditional_json_response(request, {
             "status_code": 200,
             "message": "Category retrieved successfully",
             "data": CategoryModel.from_orm(category)
-        }
+        }, etag=version_etag("category", category.id, last_modified), last_modified=last_modified)
     except HTTPException as he:
         logging.error(f"HTTP error: {he.detail}", exc_info=True)
         raise he  # Re-raise HTTPException to avoid logging it twice
@@ -128,10 +134,11 @@ async def delete_category_route(category_id: int, db: AsyncSession = Depends(get
 
 @router.get("/search/", response_model=Dict[str, Any], summary="Search for Categories")
 async def search_category(
+    request: Request,
     category_id: Optional[int] = None,
     name: Optional[str] = None,
     is_active: Optional[bool] = None,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     try:
         # Get all matching categories and the total count
@@ -144,13 +151,13 @@ async def search_category(
             raise HTTPException(status_code=404, detail="Category not found")
 
         # Return all categories and total count
-        return {
+        return conditional_json_response(request, {
             "status_code": 200,
             "message": "Categories retrieved successfully",
             "total_count": total_count,
             # Convert each category to the response model
-            "data": [CategoryModel.from_orm(category) for category in categories]
-        }
+            "data": serialize_categories(categories)
+        })
 
     except HTTPException as he:
         logging.error(f"HTTP error: {he.detail}")
@@ -1,35 +1,39 @@
 from fastapi import Query
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.models.subcategories import Subcategory
 from app.schemas.subcategories import SubcategoryModel, SubcategoryCreateModel, SubcategoryUpdateModel
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db
 from app.services.subcategories import (
     create_subcategory, get_all_subcategories, get_subcategory_by_id, update_subcategory, soft_delete_subcategory, get_subcategories_by_category_id
 )
 from app.core.logging import logging
+from app.core.responses import BulkSerializer
+from app.utils.conditional import conditional_json_response, version_etag
 
 router = APIRouter()
 
+# Precompiled bulk serializer for subcategory lists
+serialize_subcategories = BulkSerializer(SubcategoryModel)
+
 @router.post("/", response_model=dict, summary="Create new Subcategories")
 async def create_subcategory_route(
     subcategory_data: SubcategoryCreateModel, db: AsyncSession = Depends(get_db)
 ):
     try:
-        existing_subcategories = await db.execute(select(Subcategory.name).where(Subcategory.name.in_(subcategory_data.names)))
-        existing_names = existing_subcategories.scalars().all()
-        if existing_names:
+        new_subcategories, skipped_names = await create_subcategory(db, subcategory_data)
+        if not new_subcategories:
             raise HTTPException(
                 status_code=400,
-                detail=f"Subcategory names already exist: {', '.join(existing_names)}"
+                detail=f"Subcategory names already exist: {', '.join(skipped_names)}"
             )
-        new_subcategories = await create_subcategory(db, subcategory_data)
         logging.info(f"{len(new_subcategories)} subcategories created.")
         return {
             "status_code": 201,
             "message": "Subcategories created successfully",
-            "data": [SubcategoryModel.from_orm(subcat) for subcat in new_subcategories]
+            "skipped": skipped_names,
+            "data": serialize_subcategories(new_subcategories)
         }
 
     except HTTPException as he:
@@ -42,37 +46,39 @@ async def create_subcategory_route(
 
 @router.get("/all/", response_model=dict, summary="List of Subcategories")
 async def get_subcategories_route(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(10, gt=0),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     try:
         subcategories, total_count = await get_all_subcategories(db, skip=skip, limit=limit)
         logging.info("Successfully retrieved all categories.")
-        return {
+        return conditional_json_response(request, {
             "status_code": 200,
             "message": "Subcategories retrieved successfully",
             "total_count": total_count,
-            "data": [SubcategoryModel.from_orm(subcat) for subcat in subcategories]
-        }
+            "data": serialize_subcategories(subcategories)
+        })
     except Exception as e:
         logging.error(f"Failed to fetch subcategories: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to fetch subcategories")
 
 
 @router.get("/{subcategory_id}", response_model=dict, summary="Retrieve a Subcategory by ID")
-async def get_subcategory_by_id_route(subcategory_id: int, db: AsyncSession = Depends(get_db)):
+async def get_subcategory_by_id_route(request: Request, subcategory_id: int, db: AsyncSession = Depends(get_read_db)):
     try:
         subcategory = await get_subcategory_by_id(db, subcategory_id)
         if not subcategory:
             raise HTTPException(status_code=404, detail="Subcategory not found")
 
         logging.info(f"Subcategory retrieved: {subcategory.name}")
-        return {
+        last_modified = subcategory.updated_on or subcategory.created_on
+        return conditional_json_response(request, {
             "status_code": 200,
             "message": "Subcategory retrieved successfully",
             "data": SubcategoryModel.from_orm(subcategory)
-        }
+        }, etag=version_etag("subcategory", subcategory.id, last_modified), last_modified=last_modified)
     except Exception as e:
         logging.error(f"Failed to fetch subcategory: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to fetch subcategory")
@@ -124,10 +130,11 @@ async def delete_subcategory_route(subcategory_id: int, db: AsyncSession = Depen
 
 @router.get("/categories/{category_id}/subcategories", response_model=dict)
 async def get_subcategories_for_category(
+    request: Request,
     category_id: int,
     skip: int = 0,
     limit: int = 10,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     try:
         # Fetch subcategories
@@ -141,7 +148,7 @@ async def get_subcategories_for_category(
             )
 
         # Return the response with the category details and subcategories
-        return {
+        return conditional_json_response(request, {
             "status_code": 200,
             "message":"Subcategory retrieved successfully",
             "category_id": result["category_id"],
@@ -157,7 +164,7 @@ async def get_subcategories_for_category(
                 }
                 for sub in result["subcategories"]
             ]
-        }
+        })
 
     except HTTPException as e:
         logging.error(f"HTTPException: {e.detail} (Category ID: {category_id})")
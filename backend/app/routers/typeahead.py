@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_read_db
+from app.core.logging import logging
+from app.services.typeahead import typeahead
+from app.utils.conditional import conditional_json_response
+
+router = APIRouter()
+
+
+@router.get("/", response_model=dict, summary="Prefix and fuzzy suggestions for categories, subcategories and blog titles")
+async def typeahead_api(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(5, gt=0, le=20),
+    db: AsyncSession = Depends(get_read_db)
+):
+    try:
+        suggestions = await typeahead(db, q, limit=limit)
+        return conditional_json_response(request, {
+            "status_code": 200,
+            "message": "Suggestions retrieved successfully",
+            "data": suggestions
+        })
+    except HTTPException as http_exc:
+        logging.error(f"HTTP error while fetching suggestions: {str(http_exc.detail)}")
+        raise http_exc
+    except Exception as e:
+        logging.error(f"Failed to fetch suggestions: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to fetch suggestions")
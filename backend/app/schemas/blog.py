@@ -1,6 +1,6 @@
 from fastapi import UploadFile
 from pydantic import BaseModel
-from typing import Optional
+from typing import Dict, Optional
 from datetime import datetime
 
 
@@ -30,9 +30,25 @@ class BlogResponseModel(BaseModel):
     title: str
     content: str
     image: Optional[str]
+    image_derivatives: Optional[Dict[str, str]] = None
     is_active: bool
     created_on: datetime
     updated_on: Optional[datetime] = None
 
     class Config:
         from_attributes = True
+
+
+class ImageUploadRequestModel(BaseModel):
+    sha256: str
+    content_type: str
+    size: int
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "sha256": "7a603f6ac7fc059e1e4a6e0dc6730060be52acebb53c95bfcf5e3d65072aea64",
+                "content_type": "image/png",
+                "size": 1328
+            }
+        }
@@ -1,167 +1,263 @@
 import logging
 import pytz
-from sqlalchemy import select, join, func, and_
+from sqlalchemy import select, func, and_, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 from fastapi import HTTPException
 from app.models.blog import Blog
-from app.models.categories import Category
-from app.models.subcategories import Subcategory
 from app.schemas.blog import *
 from app.core.logging import logging
 from sqlalchemy.exc import IntegrityError
-from datetime import datetime
+from datetime import datetime, timezone
 from pathlib import Path
 import os
-from typing import Optional
-import shutil
+from typing import AsyncIterator, List, Optional
 from fastapi import UploadFile
-from app.core.config import MEDIA_DIR
-from sqlalchemy.orm import joinedload
+from app.core.config import MEDIA_DIR, settings
+from app.core.database import dialect_insert, read_session
+from app.core.cache import blog_detail_cache
+from app.core.singleflight import SingleFlight
+from app.core.id_allocator import HiLoIdAllocator
+from app.services.media import StoredMedia, save_upload, verify_direct_upload, delete_media, acquire_media, release_media
+from app.services.media_derivatives import schedule_derivatives
+from app.services.taxonomy import TaxonomySnapshot, taxonomy
+from sqlalchemy.orm import joinedload, load_only
 from sqlalchemy.exc import NoResultFound
+from app.utils.pagination import decode_cursor, page_cursors, CURSOR_PREV
 
-async def generate_blog_id(db: AsyncSession) -> str:
+# Concurrent identical blog reads share one in-flight query
+blog_reads = SingleFlight("blog_reads")
+
+blog_id_allocator = HiLoIdAllocator("blog", "blog", Blog.id, block_size=settings.ID_BLOCK_SIZE)
+
+async def generate_blog_id() -> str:
     try:
-        result = await db.execute(select(func.max(Blog.id)))
-        max_id = result.scalar_one_or_none()
-        new_id = (max_id + 1) if max_id is not None else 1
-        return f"blog_{new_id}"
+        return await blog_id_allocator.next_id()
     except Exception as e:
         logging.error(f"Error generating Blog ID: {str(e)}")
         raise HTTPException(status_code=500, detail="Error generating Blog ID")
 
-async def create_blog(db: AsyncSession, blog_data: dict, image_path: str = None):
+async def generate_blog_ids(count: int) -> List[str]:
     try:
-        # Validate Category ID
-        category_exists = await db.scalar(select(func.count()).select_from(Category).where(Category.id == blog_data["category_id"]))
-        if not category_exists:
+        return await blog_id_allocator.next_ids(count)
+    except Exception as e:
+        logging.error(f"Error generating Blog IDs: {str(e)}")
+        raise HTTPException(status_code=500, detail="Error generating Blog ID")
+
+def integrity_error_detail(error: IntegrityError) -> str:
+    # PostgreSQL and SQLite both name the violated constraint kind in the driver message
+    message = str(error.orig).lower()
+    if "foreign key" in message:
+        return "Category or Subcategory ID not found"
+    return "Blog conflicts with an existing blog"
+
+
+async def create_blog(db: AsyncSession, blog_data: dict, image: Optional[StoredMedia] = None):
+    try:
+        # Validate Category and Subcategory IDs against the in-memory taxonomy; no round trip
+        snapshot = await taxonomy.ensure([blog_data["category_id"]], [blog_data["subcategory_id"]])
+        if blog_data["category_id"] not in snapshot.categories:
             logging.warning(f"Category ID {blog_data['category_id']} not found")
             raise HTTPException(status_code=400, detail="Category ID not found")
 
-        # Validate Subcategory ID
-        subcategory_exists = await db.scalar(
-            select(func.count()).select_from(Subcategory)
-            .where(Subcategory.id == blog_data["subcategory_id"]))
-        if not subcategory_exists:
+        subcategory = snapshot.subcategories.get(blog_data["subcategory_id"])
+        if subcategory is None:
             logging.warning(f"Subcategory ID {blog_data['subcategory_id']} not found")
             raise HTTPException(status_code=400, detail="Subcategory ID not found")
 
-        # Check if the blog title already exists
-        title_exists = await db.scalar(
-            select(func.count()).select_from(Blog)
-            .where(Blog.title == blog_data["title"]))
-        if title_exists:
+        if subcategory.category_id != blog_data["category_id"]:
+            logging.warning(f"Subcategory ID {subcategory.id} does not belong to Category ID {blog_data['category_id']}")
+            raise HTTPException(status_code=400, detail="Subcategory does not belong to the Category")
+
+        # Use the ID the caller reserved, if any, or take one from the in-memory block
+        new_blog_id = blog_data.get("blog_id") or await generate_blog_id()
+
+        # The unique title index does the duplicate check: a conflicting insert returns no row
+        new_blog = await db.scalar(
+            dialect_insert(db, Blog)
+            .values(
+                blog_id=new_blog_id,
+                title=blog_data["title"],
+                category_id=blog_data["category_id"],
+                subcategory_id=blog_data["subcategory_id"],
+                content=blog_data["content"],
+                image=image.key if image else None,
+                is_active=blog_data["is_active"],
+                created_on=datetime.now(),
+                updated_on=None
+            )
+            .on_conflict_do_nothing(index_elements=[Blog.title])
+            .returning(Blog)
+        )
+        if new_blog is None:
             logging.warning(f"Blog title '{blog_data['title']}' already exists")
             raise HTTPException(status_code=400, detail="Blog title already exists")
 
-        # Generate a unique blog ID
-        new_blog_id = await generate_blog_id(db)
-
-        # Create a new Blog instance using ORM
-        new_blog = Blog(
-            blog_id=new_blog_id,
-            title=blog_data["title"],
-            category_id=blog_data["category_id"],
-            subcategory_id=blog_data["subcategory_id"],
-            content=blog_data["content"],
-            image=image_path,
-            is_active=blog_data["is_active"],
-            created_on=datetime.now(),
-            updated_on=None
-        )
-
-        db.add(new_blog)
+        if image:
+            # The reference is counted in the same transaction as the row that holds it
+            await acquire_media(db, image)
         await db.commit()
 
-        # Refresh the object to get the updated instance
-        await db.refresh(new_blog)
-
         logging.info(f"Blog '{blog_data['title']}' created successfully with ID {new_blog_id}")
         return new_blog
 
+    except HTTPException:
+        await db.rollback()
+        raise
+
     except IntegrityError as e:
         await db.rollback()
         logging.error(f"IntegrityError occurred: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"IntegrityError: {str(e)}")
+        raise HTTPException(status_code=400, detail=integrity_error_detail(e))
 
     except Exception as exc:
         await db.rollback()
         logging.error(f"Unexpected error occurred: {str(exc)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"An unexpected error occurred: {str(exc)}")
 
-    finally:
-        await db.close()
-        
 
-async def get_all_blog_detail(db: AsyncSession, skip: int = 0, limit: int = 10):
+# Filled in from the taxonomy snapshot instead of joining categories and subcategories
+TAXONOMY_FIELDS = ["category_id", "category_name", "subcategory_id", "subcategory_name"]
+
+# Columns the blog listing can project, keyed by response field name;
+# subcategory_id is always read, it is what the taxonomy fields are looked up by
+BLOG_DETAIL_COLUMNS = {
+    "subcategory_id": Blog.subcategory_id,
+    "id": Blog.id,
+    "blog_id": Blog.blog_id,
+    "blog_title": Blog.title,
+    "blog_content": Blog.content,
+    "blog_image": Blog.image,
+    "is_active": Blog.is_active,
+    "created_on": Blog.created_on,
+    "updated_on": Blog.updated_on,
+}
+BLOG_DETAIL_FIELDS = TAXONOMY_FIELDS + [field for field in BLOG_DETAIL_COLUMNS if field not in TAXONOMY_FIELDS]
+BLOG_DETAIL_SUMMARY_FIELDS = [field for field in BLOG_DETAIL_FIELDS if field != "blog_content"]
+
+# Blog attributes exposed by the subcategory blog listing
+SUBCATEGORY_BLOG_FIELDS = ["id", "title", "content", "image", "is_active", "created_on", "updated_on"]
+SUBCATEGORY_BLOG_SUMMARY_FIELDS = [field for field in SUBCATEGORY_BLOG_FIELDS if field != "content"]
+
+def listed_blogs(snapshot: TaxonomySnapshot):
+    """Blogs the old category/subcategory join returned: in a subcategory whose category exists."""
+    condition = Blog.subcategory_id.is_not(None)
+    if snapshot.uncategorized:
+        condition = and_(condition, Blog.subcategory_id.not_in(snapshot.uncategorized))
+    return condition
+
+
+def blog_detail_columns(fields) -> list:
+    return [column.label(field) for field, column in BLOG_DETAIL_COLUMNS.items() if field in fields or field == "subcategory_id"]
+
+
+async def with_taxonomy(rows) -> List[dict]:
+    """Blog rows as dicts, with the category/subcategory fields added from the taxonomy snapshot."""
+    snapshot = await taxonomy.ensure(subcategory_ids={row.subcategory_id for row in rows})
+    return [{**snapshot.names(row.subcategory_id), **row._mapping} for row in rows]
+
+
+@blog_reads.coalesce("all_blog_detail")
+async def get_all_blog_detail(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    use_cursor: bool = False,
+    fields: Optional[List[str]] = None
+):
     try:
-        result = await db.execute(
-            select(
-                Category.id.label("category_id"),
-                Category.name.label("category_name"),
-                Subcategory.id.label("subcategory_id"),
-                Subcategory.name.label("subcategory_name"),
-                Blog.id.label("id"),
-                Blog.blog_id.label("blog_id"),
-                Blog.title.label("blog_title"),
-                Blog.content.label("blog_content"),
-                Blog.image.label("blog_image"),
-                Blog.is_active.label("is_active"),
-                Blog.created_on.label("created_on"),
-                Blog.updated_on.label("updated_on")
-            )
-            .select_from(
-                 join(Category, Subcategory, Category.id == Subcategory.category_id)
-                .join(Blog, Subcategory.id == Blog.subcategory_id)
-            )
-            .where(Blog.is_active == True)
-            .order_by(Blog.id.desc())
-            .offset(skip)
-            .limit(limit)
-        )
-        blog_details = result.all()
-
-        total_count_result = await db.execute(
-            select(func.count(Blog.id))
-            .select_from(
-                join(Category, Subcategory, Category.id == Subcategory.category_id)
-                .join(Blog, Subcategory.id == Blog.subcategory_id)
+        # id and created_on are always selected because the keyset cursor is built from them
+        selected = set(fields or BLOG_DETAIL_FIELDS) | {"id", "created_on"}
+        listed = listed_blogs(await taxonomy.get())
+        query = select(*blog_detail_columns(selected)).where(Blog.is_active == True, listed)
+
+        next_cursor = prev_cursor = None
+        if cursor or use_cursor:
+            # Keyset pagination on (created_on, id): cost is independent of page depth
+            direction = None
+            if cursor:
+                cursor_created_on, cursor_id, direction = decode_cursor(cursor)
+                position = tuple_(Blog.created_on, Blog.id)
+                if direction == CURSOR_PREV:
+                    query = query.where(position > tuple_(cursor_created_on, cursor_id))
+                else:
+                    query = query.where(position < tuple_(cursor_created_on, cursor_id))
+
+            if direction == CURSOR_PREV:
+                query = query.order_by(Blog.created_on.asc(), Blog.id.asc())
+            else:
+                query = query.order_by(Blog.created_on.desc(), Blog.id.desc())
+
+            result = await db.execute(query.limit(limit + 1))
+            blog_details = result.all()
+            has_more = len(blog_details) > limit
+            blog_details = blog_details[:limit]
+            if direction == CURSOR_PREV:
+                blog_details.reverse()
+            next_cursor, prev_cursor = page_cursors(blog_details, direction, has_more)
+        else:
+            result = await db.execute(query.order_by(Blog.id.desc()).offset(skip).limit(limit))
+            blog_details = result.all()
+
+        total_count = None
+        if include_total:
+            total_count_result = await db.execute(
+                select(func.count(Blog.id)).where(Blog.is_active == True, listed)
             )
-            .where(Blog.is_active == True)
-        )
-        total_count = total_count_result.scalar()
+            total_count = total_count_result.scalar()
 
         logging.info("Successfully retrieved all active blogs with details.")
-        return blog_details, total_count
+        return await with_taxonomy(blog_details), total_count, next_cursor, prev_cursor
 
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Failed to fetch blog details: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail="Failed to fetch blog details")
         
 
+async def stream_blog_export(since: Optional[datetime] = None, include_inactive: bool = False) -> AsyncIterator:
+    # Uses its own session: the response keeps streaming after the request's get_db session is gone
+    query = (
+        select(*blog_detail_columns(BLOG_DETAIL_COLUMNS))
+        .where(listed_blogs(await taxonomy.get()))
+        .order_by(Blog.id)
+        .execution_options(yield_per=settings.EXPORT_YIELD_PER)
+    )
+    if not include_inactive:
+        query = query.where(Blog.is_active == True)
+    if since is not None:
+        if since.tzinfo is not None:
+            # The timestamp columns are naive UTC; comparing an aware value against them fails on asyncpg
+            since = since.astimezone(timezone.utc).replace(tzinfo=None)
+        query = query.where(func.coalesce(Blog.updated_on, Blog.created_on) >= since)
+
+    # Bulk reads go to a replica when one is configured and healthy
+    async with read_session() as session:
+        # stream() runs on a server-side cursor, so only one batch is held in memory
+        result = await session.stream(query)
+        async for rows in result.partitions():
+            for row in await with_taxonomy(rows):
+                yield row
+    logging.info("Blog export stream finished.")
+
+
+@blog_reads.coalesce("blog_detail")
 async def get_blog_detail_by_id(db: AsyncSession, blog_detail_id: int):
     try:
-        # Perform the join between categories, subcategories, and blog for the specific blog ID
+        # Serve from the two-tier cache when possible; writes below invalidate entries. A client
+        # pinned to the primary after a write skips it, since a lagging replica may have refilled it
+        if not db.info.get("primary_pinned"):
+            cached_detail = await blog_detail_cache.get(blog_detail_id)
+            if cached_detail is not None:
+                return cached_detail
+
+        # Blog columns only; the category and subcategory names come from the taxonomy cache
         result = await db.execute(
-            select(
-                Category.id.label("category_id"),
-                Category.name.label("category_name"),
-                Subcategory.id.label("subcategory_id"),
-                Subcategory.name.label("subcategory_name"),
-                Blog.id.label("id"),
-                Blog.blog_id.label("blog_id"),
-                Blog.title.label("blog_title"),
-                Blog.content.label("blog_content"),
-                Blog.image.label("blog_image"),
-                Blog.is_active.label("is_active"),
-                Blog.created_on.label("created_on"),
-                Blog.updated_on.label("updated_on")
-            )
-            .select_from(
-                join(Category, Subcategory, Category.id == Subcategory.category_id)
-                .join(Blog, Subcategory.id == Blog.subcategory_id)
-            )
-            .where(Blog.id == blog_detail_id)
+            select(*blog_detail_columns(BLOG_DETAIL_COLUMNS))
+            .where(Blog.id == blog_detail_id, listed_blogs(await taxonomy.get()))
         )
 
         blog_detail = result.fetchone()
@@ -173,7 +269,7 @@ async def get_blog_detail_by_id(db: AsyncSession, blog_detail_id: int):
         # Check if the blog is active
         if not blog_detail.is_active:
             logging.info(f"Blog with ID {blog_detail_id} is not active.")
-            return {
+            payload = {
                 "status_code": 200,
                 "message": "Blog is not active",
                 "data": {
@@ -181,42 +277,44 @@ async def get_blog_detail_by_id(db: AsyncSession, blog_detail_id: int):
                     "blog_title": blog_detail.blog_title
                 }
             }
+        else:
+            logging.info(f"Successfully retrieved blog with ID {blog_detail_id}.")
+            payload = (await with_taxonomy([blog_detail]))[0]
 
-        logging.info(f"Successfully retrieved blog with ID {blog_detail_id}.")
-        return blog_detail
+        await blog_detail_cache.set(blog_detail_id, payload)
+        return payload
 
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Error retrieving blog detail with ID {blog_detail_id}: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail="Error retrieving Blog")
 
 
-async def handle_image_update(blog, new_image: UploadFile):
-    existing_image_path = os.path.join(MEDIA_DIR, blog.image)
+async def handle_image_update(db: AsyncSession, blog, new_image: Optional[UploadFile] = None, image_key: Optional[str] = None):
+    old_image = blog.image
 
-    # Delete old image if it exists
-    if blog.image and os.path.exists(existing_image_path):
-        try:
-            os.remove(existing_image_path)
-            logging.info(f"Old image {blog.image} deleted successfully.")
-        except Exception as e:
-            logging.error(f"Failed to delete old image {blog.image}: {str(e)}")
+    # Save the new image first so a failed upload leaves the current one in place
+    if new_image:
+        stored_image = await save_upload(new_image)
+    else:
+        stored_image = await verify_direct_upload(db, image_key)
+    if stored_image.key == old_image:
+        return stored_image, None
 
-    # Save the new image
-    new_image_filename = f"blog_{blog.id}_{new_image.filename}"
-    new_image_path = os.path.join(MEDIA_DIR, new_image_filename)
+    # Move the reference from the old object to the new one in the caller's transaction
+    await acquire_media(db, stored_image)
+    replaced_file = await release_media(db, old_image)
+    blog.image = stored_image.key
+    await blog_detail_cache.delete(blog.id)
+    logging.info(f"New image {stored_image.key} saved successfully.")
 
-    try:
-        with open(new_image_path, "wb") as buffer: shutil.copyfileobj(new_image.file, buffer)
-
-        # Update the blog image field with just the new image filename
-        blog.image = new_image_filename
-        logging.info(f"New image {new_image_filename} saved successfully.")
-    except Exception as e:
-        logging.error(f"Failed to save new image {new_image_filename}: {str(e)}")
-        raise HTTPException(status_code=500, detail="Failed to upload new image")
+    # Legacy (non content-addressed) files are removed by the caller once the commit succeeded
+    return stored_image, replaced_file
 
 
-async def update_blog_details(db: AsyncSession, blog_detail_id: int, blog_data: BlogUpdateModel, new_image: UploadFile = None):
+async def update_blog_details(db: AsyncSession, blog_detail_id: int, blog_data: BlogUpdateModel, new_image: UploadFile = None,
+                              image_key: Optional[str] = None):
     # Retrieve the blog entry by ID
     blog = await db.get(Blog, blog_detail_id)
 
@@ -239,15 +337,21 @@ async def update_blog_details(db: AsyncSession, blog_detail_id: int, blog_data:
         setattr(blog, key, value)
 
     # Handle new image if provided
-    if new_image:
-        await handle_image_update(blog, new_image)
+    stored_image = replaced_image = None
+    if new_image or image_key:
+        stored_image, replaced_image = await handle_image_update(db, blog, new_image, image_key)
 
     # Commit the changes to the database
     try:
         await db.commit()
         await db.refresh(blog)
+        await blog_detail_cache.delete(blog_detail_id)
+        await delete_media(replaced_image)
+        if stored_image and stored_image.created:
+            schedule_derivatives(stored_image.key)
         return blog
     except Exception as e:
+        # A newly stored object without a committed reference is left for collection
         await db.rollback()
         logging.error(f"Error updating blog: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to update blog")
@@ -270,6 +374,7 @@ async def soft_delete_blog_detail(db: AsyncSession, blog_detail_id: int):
         db.add(blog_detail)
         await db.commit()
         await db.refresh(blog_detail)
+        await blog_detail_cache.delete(blog_detail_id)
         
         logging.info(f"Blog with ID {blog_detail_id} soft deleted successfully.")
         return blog_detail
@@ -279,55 +384,55 @@ async def soft_delete_blog_detail(db: AsyncSession, blog_detail_id: int):
         logging.error(f"Failed to soft delete blog with ID {blog_detail_id}: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail="Failed to soft delete blog")
 
-async def get_blogdetail_by_subcategory_id(db: AsyncSession, subcategory_id: int, skip: int = 0, limit: int = 10):
+async def get_blogdetail_by_subcategory_id(
+    db: AsyncSession,
+    subcategory_id: int,
+    skip: int = 0,
+    limit: int = 10,
+    fields: Optional[List[str]] = None
+):
     try:
         logging.info(f"Fetching blog details for subcategory ID: {subcategory_id}.")
 
-        # Query to get the subcategory along with its associated blogs and category
-        query = (
-            select(Subcategory)
-            .options(
-                joinedload(Subcategory.blogs),
-                joinedload(Subcategory.category)
-            )
-            .where(Subcategory.id == subcategory_id)
-        )
-
-        # Execute the query and get the result
-        result = await db.execute(query)
-
-        # Retrieve the unique subcategory result
-        subcategory = result.unique().scalar_one_or_none()
-
         # Check if the subcategory exists
-        if not subcategory:
+        snapshot = await taxonomy.ensure(subcategory_ids=[subcategory_id])
+        if subcategory_id not in snapshot.subcategories:
             logging.warning(f"Subcategory with ID {subcategory_id} not found.")
             raise HTTPException(status_code=404, detail="Subcategory not found.")
 
-        # Filter blogs to include only those that are active
-        active_blogs = [blog for blog in subcategory.blogs if blog.is_active]
-
-        logging.info(f"Retrieved {len(active_blogs)} active blogs for subcategory ID: {subcategory_id}.")
-
-        # Implement pagination for active blogs
-        paginated_blogs = active_blogs[skip: skip + limit]
-
-        # Count total active blogs
-        total_active_blogs_count = len(active_blogs)
+        # Both blog counts in a single aggregate query
+        counts_result = await db.execute(
+            select(
+                func.count(Blog.id).filter(Blog.is_active == True).label("total_active_blogs"),
+                func.count(Blog.id).label("total_all_blogs")
+            )
+            .where(Blog.subcategory_id == subcategory_id)
+        )
+        counts = counts_result.one()
+
+        # Only the requested page of active blogs is loaded, and only the requested columns;
+        # everything else (notably content) stays deferred
+        blogs_result = await db.execute(
+            select(Blog)
+            .options(load_only(*[getattr(Blog, field) for field in (fields or SUBCATEGORY_BLOG_FIELDS)]))
+            .where(Blog.subcategory_id == subcategory_id, Blog.is_active == True)
+            .order_by(Blog.id.desc())
+            .offset(skip)
+            .limit(limit)
+        )
+        paginated_blogs = blogs_result.scalars().all()
 
-        # Count total blogs in the subcategory (active + inactive)
-        total_all_blogs_count = len(subcategory.blogs)
+        logging.info(f"Retrieved {len(paginated_blogs)} of {counts.total_active_blogs} active blogs for subcategory ID: {subcategory_id}.")
 
         return {
-            "subcategory_id": subcategory.id,
-            "subcategory_name": subcategory.name,
-            "category_id": subcategory.category.id,
-            "category_name": subcategory.category.name,
+            **snapshot.names(subcategory_id),
             "blogs": paginated_blogs,
-            "total_active_blogs": total_active_blogs_count,
-            "total_all_blogs": total_all_blogs_count
+            "total_active_blogs": counts.total_active_blogs,
+            "total_all_blogs": counts.total_all_blogs
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Error fetching blogs for subcategory ID {subcategory_id}: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail="Failed to fetch blogs.")
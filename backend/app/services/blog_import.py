@@ -0,0 +1,221 @@
+import csv
+import json
+from collections import Counter
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import dialect_insert
+from app.core.logging import logging
+from app.models.blog import Blog
+from app.services.blog import generate_blog_ids
+from app.services.media import StoredMedia, acquire_media, verify_direct_upload
+from app.services.media_derivatives import schedule_derivatives
+from app.services.taxonomy import taxonomy
+from app.utils.media_keys import is_content_addressed
+
+IMPORT_FORMATS = ("ndjson", "csv")
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, str]]:
+    # Split the raw request stream into (line_number, text) without buffering the body
+    pending = b""
+    line_number = 0
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            line_number += 1
+            yield line_number, line.decode("utf-8").rstrip("\r")
+    if pending:
+        yield line_number + 1, pending.decode("utf-8").rstrip("\r")
+
+
+async def iter_ndjson_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Any]]:
+    async for line_number, line in iter_lines(chunks):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except json.JSONDecodeError as e:
+            yield line_number, ValueError(f"Invalid JSON: {e.msg}")
+
+
+async def iter_csv_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Any]]:
+    header: Optional[List[str]] = None
+    record, start_line = "", 0
+    async for line_number, line in iter_lines(chunks):
+        if not record:
+            if not line.strip():
+                continue
+            start_line = line_number
+            record = line
+        else:
+            record += "\n" + line
+        # A quoted field may contain newlines; keep reading until the quotes balance
+        if record.count('"') % 2:
+            continue
+        values = next(csv.reader([record]))
+        record = ""
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        if len(values) != len(header):
+            yield start_line, ValueError(f"Expected {len(header)} columns, got {len(values)}")
+            continue
+        yield start_line, dict(zip(header, values))
+    if record:
+        yield start_line, ValueError("Unterminated quoted field")
+
+
+def parse_blog_record(record: Any) -> Dict[str, Any]:
+    if isinstance(record, Exception):
+        raise record
+    if not isinstance(record, dict):
+        raise ValueError("Each record must be an object")
+    title = record.get("title") or ""
+    content = record.get("content") or ""
+    if not isinstance(title, str) or not isinstance(content, str):
+        raise ValueError("title and content must be strings")
+    title = title.strip()
+    if not title:
+        raise ValueError("title is required")
+    if not content:
+        raise ValueError("content is required")
+    try:
+        category_id = int(record["category_id"])
+        subcategory_id = int(record["subcategory_id"])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("category_id and subcategory_id must be integers")
+    is_active = record.get("is_active", True)
+    if isinstance(is_active, str):
+        is_active = is_active.strip().lower() not in ("0", "false", "no", "")
+    image = record.get("image") or None
+    if image is not None and not is_content_addressed(image):
+        # Only content-addressed objects (e.g. uploaded through /uploads/presign) can be referenced
+        raise ValueError("image must be the key of an uploaded image")
+    return {
+        "title": title,
+        "content": content,
+        "category_id": category_id,
+        "subcategory_id": subcategory_id,
+        "is_active": bool(is_active),
+        "image": image,
+    }
+
+
+async def _import_chunk(db: AsyncSession, chunk: List[Tuple[int, Any]]) -> List[Dict[str, Any]]:
+    results: Dict[int, Dict[str, Any]] = {}
+    rows: List[Tuple[int, Dict[str, Any]]] = []
+    for line_number, record in chunk:
+        try:
+            rows.append((line_number, parse_blog_record(record)))
+        except ValueError as e:
+            results[line_number] = {"line": line_number, "status": "error", "error": str(e)}
+
+    # Validate every referenced category/subcategory against the in-memory taxonomy
+    if rows:
+        snapshot = await taxonomy.ensure(
+            {row["category_id"] for _, row in rows}, {row["subcategory_id"] for _, row in rows}
+        )
+        valid_rows = []
+        for line_number, row in rows:
+            if row["category_id"] not in snapshot.categories:
+                results[line_number] = {"line": line_number, "status": "error", "error": "Category ID not found"}
+            elif row["subcategory_id"] not in snapshot.subcategories:
+                results[line_number] = {"line": line_number, "status": "error", "error": "Subcategory ID not found"}
+            elif snapshot.subcategories[row["subcategory_id"]].category_id != row["category_id"]:
+                results[line_number] = {
+                    "line": line_number, "status": "error", "error": "Subcategory does not belong to the Category"
+                }
+            else:
+                valid_rows.append((line_number, row))
+        rows = valid_rows
+
+    # Each referenced image must exist in storage; checked once per key
+    images: Dict[str, StoredMedia] = {}
+    if rows:
+        valid_rows = []
+        for line_number, row in rows:
+            key = row["image"]
+            if key is not None and key not in images:
+                try:
+                    images[key] = await verify_direct_upload(db, key)
+                except HTTPException as e:
+                    results[line_number] = {"line": line_number, "status": "error", "error": e.detail}
+                    continue
+            valid_rows.append((line_number, row))
+        rows = valid_rows
+
+    if rows:
+        blog_ids = await generate_blog_ids(len(rows))
+        now = datetime.now()
+        values = [
+            {**row, "blog_id": blog_id, "created_on": now}
+            for (_, row), blog_id in zip(rows, blog_ids)
+        ]
+        try:
+            # Titles that already exist (in the table or earlier in this chunk) are skipped
+            inserted = await db.execute(
+                dialect_insert(db, Blog)
+                .values(values)
+                .on_conflict_do_nothing(index_elements=[Blog.title])
+                .returning(Blog.id, Blog.blog_id)
+            )
+            inserted_by_blog_id = {blog_id: blog_pk for blog_pk, blog_id in inserted.all()}
+            # One media reference per created blog, counted per key and committed with the rows themselves
+            references = Counter(
+                value["image"] for value in values
+                if value["image"] is not None and value["blog_id"] in inserted_by_blog_id
+            )
+            for key, count in references.items():
+                await acquire_media(db, images[key], count)
+            await db.commit()
+        except Exception as e:
+            await db.rollback()
+            logging.error(f"Blog import chunk failed: {str(e)}", exc_info=True)
+            for line_number, _ in rows:
+                results[line_number] = {"line": line_number, "status": "error", "error": "Insert failed"}
+        else:
+            # Renditions for images referenced for the first time, as create_blog does
+            for key in {value["image"] for value in values if value["blog_id"] in inserted_by_blog_id}:
+                if key is not None and images[key].created:
+                    schedule_derivatives(key)
+            for (line_number, row), value in zip(rows, values):
+                blog_pk = inserted_by_blog_id.get(value["blog_id"])
+                if blog_pk is None:
+                    results[line_number] = {"line": line_number, "status": "skipped", "error": "Blog title already exists"}
+                else:
+                    results[line_number] = {"line": line_number, "status": "created", "id": blog_pk, "blog_id": value["blog_id"]}
+
+    return [results[line_number] for line_number, _ in chunk]
+
+
+async def import_blogs(db: AsyncSession, chunks: AsyncIterator[bytes], data_format: str, chunk_size: int) -> Dict[str, Any]:
+    if data_format not in IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported import format: {data_format}")
+    records = iter_ndjson_records(chunks) if data_format == "ndjson" else iter_csv_records(chunks)
+
+    results: List[Dict[str, Any]] = []
+    counts = {"created": 0, "skipped": 0, "error": 0}
+    chunk: List[Tuple[int, Any]] = []
+
+    async def flush():
+        chunk_results = await _import_chunk(db, chunk)
+        for result in chunk_results:
+            counts[result["status"]] += 1
+        results.extend(chunk_results)
+        chunk.clear()
+
+    try:
+        async for line_number, record in records:
+            chunk.append((line_number, record))
+            if len(chunk) >= chunk_size:
+                await flush()
+        if chunk:
+            await flush()
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Import body must be UTF-8 encoded")
+
+    logging.info(f"Blog import finished: {counts['created']} created, {counts['skipped']} skipped, {counts['error']} failed.")
+    return {"counts": counts, "results": results}
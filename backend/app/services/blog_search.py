@@ -0,0 +1,142 @@
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+from fastapi import HTTPException
+from sqlalchemy import column, func, join, literal_column, select, table, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.logging import logging
+from app.models.blog import Blog, SEARCH_CONFIG
+from app.services.blog import listed_blogs, with_taxonomy
+from app.services.taxonomy import taxonomy
+from app.utils.pagination import decode_rank_cursor, encode_rank_cursor
+
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_STOP = "</mark>"
+SNIPPET_WORDS = 24
+# Relative title/content weights; PostgreSQL's defaults for A (1.0) and B (0.4) labels, mirrored for bm25
+TITLE_WEIGHT = 1.0
+CONTENT_WEIGHT = 0.4
+
+# The SQLite FTS5 table (see app/models/blog.py); rowid is blog.id
+blog_fts = table("blog_fts", column("rowid"), column("title"), column("content"))
+SEARCH_TOKEN = re.compile(r"\w+")
+
+
+@dataclass
+class SearchTerms:
+    """Dialect specific pieces of a search: what to select from, the match condition, rank and highlights."""
+
+    source: object
+    match: object
+    rank: object
+    title: object
+    snippet: object
+
+
+def postgres_terms(q: str) -> SearchTerms:
+    # websearch_to_tsquery accepts free text ("quoted phrases", -exclusions, or) and never raises on syntax
+    query = func.websearch_to_tsquery(SEARCH_CONFIG, q)
+    vector = literal_column("blog.search_vector")
+    headline = f"StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}"
+    return SearchTerms(
+        source=Blog.__table__,
+        match=vector.op("@@")(query),
+        rank=func.ts_rank_cd(vector, query),
+        title=func.ts_headline(SEARCH_CONFIG, Blog.title, query, f"{headline}, HighlightAll=true"),
+        snippet=func.ts_headline(
+            SEARCH_CONFIG, Blog.content, query, f"{headline}, MaxWords={SNIPPET_WORDS}, MinWords={SNIPPET_WORDS // 2}"
+        ),
+    )
+
+
+def sqlite_terms(q: str) -> Optional[SearchTerms]:
+    # Every word becomes a quoted FTS5 string, so user input can never be a query syntax error
+    words = SEARCH_TOKEN.findall(q)
+    if not words:
+        return None
+    fts = literal_column("blog_fts")
+    return SearchTerms(
+        source=join(blog_fts, Blog, Blog.id == blog_fts.c.rowid),
+        match=fts.op("MATCH")(" ".join('"' + word + '"' for word in words)),
+        # bm25 is lower for better matches
+        rank=-func.bm25(fts, TITLE_WEIGHT, CONTENT_WEIGHT),
+        title=func.highlight(fts, 0, HIGHLIGHT_START, HIGHLIGHT_STOP),
+        snippet=func.snippet(fts, 1, HIGHLIGHT_START, HIGHLIGHT_STOP, "…", SNIPPET_WORDS),
+    )
+
+
+async def search_blogs(
+    db: AsyncSession,
+    q: str,
+    category_id: Optional[int] = None,
+    subcategory_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    limit: int = 10
+) -> Tuple[List[dict], Optional[str]]:
+    """Active blogs matching ``q``, best match first; returns the page and the cursor of the next one."""
+    try:
+        terms = postgres_terms(q) if db.bind.dialect.name == "postgresql" else sqlite_terms(q)
+        if terms is None:
+            return [], None
+
+        snapshot = await taxonomy.get()
+        filters = [terms.match, Blog.is_active == True, listed_blogs(snapshot)]
+        if subcategory_id is not None:
+            filters.append(Blog.subcategory_id == subcategory_id)
+        if category_id is not None:
+            # Listings show the subcategory's category, so filter the same way
+            filters.append(Blog.subcategory_id.in_([
+                subcategory.id for subcategory in snapshot.subcategories.values()
+                if subcategory.category_id == category_id
+            ]))
+
+        # Rank every match, then keep one page; highlights are only built for that page
+        matches = (
+            select(Blog.id.label("id"), terms.rank.label("score"))
+            .select_from(terms.source)
+            .where(*filters)
+            .subquery("matches")
+        )
+        page_query = select(matches.c.id, matches.c.score)
+        if cursor:
+            cursor_rank, cursor_id = decode_rank_cursor(cursor)
+            page_query = page_query.where(tuple_(matches.c.score, matches.c.id) < tuple_(cursor_rank, cursor_id))
+        page = (
+            page_query
+            .order_by(matches.c.score.desc(), matches.c.id.desc())
+            .limit(limit + 1)
+            .subquery("page")
+        )
+
+        result = await db.execute(
+            select(
+                Blog.id.label("id"),
+                Blog.subcategory_id.label("subcategory_id"),
+                Blog.blog_id.label("blog_id"),
+                Blog.title.label("blog_title"),
+                terms.title.label("title_highlight"),
+                terms.snippet.label("snippet"),
+                Blog.image.label("blog_image"),
+                Blog.created_on.label("created_on"),
+                Blog.updated_on.label("updated_on"),
+                page.c.score.label("rank"),
+            )
+            .select_from(join(terms.source, page, page.c.id == Blog.id))
+            .where(terms.match)
+            .order_by(page.c.score.desc(), page.c.id.desc())
+        )
+        rows = result.all()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_rank_cursor(rows[-1].rank, rows[-1].id)
+
+        logging.info(f"Blog search for '{q}' returned {len(rows)} results.")
+        return await with_taxonomy(rows), next_cursor
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error searching blogs for '{q}': {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to search blogs")
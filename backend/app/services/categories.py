@@ -6,39 +6,52 @@ from sqlalchemy import func, desc
 from app.models.categories import Category
 from app.schemas.categories import CategoryCreateModel, CategoryModel, CategoryUpdateModel
 from app.core.logging import logging
+from app.core.cache import blog_detail_cache
+from app.core.config import settings
+from app.core.id_allocator import HiLoIdAllocator
+from app.core.database import dialect_insert
+from app.services.taxonomy import bump_taxonomy_version, taxonomy
 from datetime import datetime
 
-async def generate_cat_id(db: AsyncSession) -> str:
+cat_id_allocator = HiLoIdAllocator("cat", "cat", Category.id, block_size=settings.ID_BLOCK_SIZE)
+
+async def generate_cat_id() -> str:
     try:
-        # Get the last inserted ID
-        result = await db.execute(select(func.max(Category.id)))
-        max_id = result.scalar_one_or_none()
-        # Start from 1 if no categories exist
-        new_id = (max_id + 1) if max_id is not None else 1
-        return f"cat_{new_id}"
+        return await cat_id_allocator.next_id()
     except Exception as e:
         logging.error(f"Error generating category ID: {str(e)}")
         raise HTTPException(status_code=500, detail="Error generating category ID")
 
 async def create_category(db: AsyncSession, category_data: CategoryCreateModel):
     try:
-        categories = []
-        for name in category_data.names:
-            new_cat_id = await generate_cat_id(db)
-            new_category = Category(
-                cat_id=new_cat_id,
-                name=name,
-                is_active=category_data.is_active,
-            )
-            db.add(new_category)
-            categories.append(new_category)
-
+        # Drop duplicates within the request while keeping the caller's order
+        names = list(dict.fromkeys(category_data.names))
+        if not names:
+            return [], []
+        cat_ids = await cat_id_allocator.next_ids(len(names))
+
+        # One multi-row INSERT; names that already exist are skipped by the conflict clause
+        result = await db.scalars(
+            dialect_insert(db, Category)
+            .values([
+                {"cat_id": cat_id, "name": name, "is_active": category_data.is_active}
+                for cat_id, name in zip(cat_ids, names)
+            ])
+            .on_conflict_do_nothing(index_elements=[Category.name])
+            .returning(Category)
+        )
+        created = {category.name: category for category in result.all()}
+        if created:
+            await bump_taxonomy_version(db)
         await db.commit()
-        for category in categories:
-            await db.refresh(category)
-        logging.info(f"Successfully created {len(categories)} categories.")
-        return categories
+        taxonomy.invalidate()
+
+        categories = [created[name] for name in names if name in created]
+        skipped = [name for name in names if name not in created]
+        logging.info(f"Successfully created {len(categories)} categories, skipped {len(skipped)} existing.")
+        return categories, skipped
     except Exception as e:
+        await db.rollback()
         logging.error(f"Failed to create categories: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail="Failed to create categories")
 
@@ -86,9 +99,14 @@ async def update_category(db: AsyncSession, category_id: int, category_data: Cat
             category.name = category_data.name
         if category_data.is_active is not None:
             category.is_active = category_data.is_active
+        await bump_taxonomy_version(db)
         # Commit changes to the database
         await db.commit()
+        taxonomy.invalidate()
         await db.refresh(category)
+        # Cached blog details embed the category name
+        if category_data.name is not None:
+            await blog_detail_cache.clear()
         logging.info(f"Category with ID {category_id} updated successfully.")
         return category
     except Exception as e:
@@ -104,7 +122,9 @@ async def soft_delete_category(db: AsyncSession, category_id: int):
             return None
         # Set is_active to False for soft delete
         category.is_active = False
+        await bump_taxonomy_version(db)
         await db.commit()
+        taxonomy.invalidate()
         await db.refresh(category)
         logging.info(f"Category with ID {category_id} soft deleted successfully.")
         return category
@@ -136,13 +156,8 @@ async def get_category_by_search(
         # Fetch all matching categories
         categories = result.scalars().all()
 
-        # Execute a count query to get the total number of matching records
-        total_count = await db.execute(select(func.count()).select_from(Category).where(
-            (Category.id == category_id) if category_id else True,
-            (Category.name.ilike(f"%{name}%")) if name else True,
-            (Category.is_active == is_active) if is_active is not None else True
-        ))
-        total_count_value = total_count.scalar()
+        # Every match is already loaded, so the count needs no second scan
+        total_count_value = len(categories)
         logging.info(f"Total categories found: {total_count_value}")
         return categories, total_count_value
     except Exception as e:
@@ -0,0 +1,209 @@
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+from fastapi import HTTPException, UploadFile
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.core.database import dialect_insert
+from app.core.logging import logging
+from app.core.storage import media_storage
+from app.models.media import MediaObject
+from app.services.media_derivatives import remove_derivatives
+from app.utils.media_keys import is_content_addressed, media_key, media_relpath
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Types accepted for uploads, keyed by the Content-Type a direct upload declares
+IMAGE_EXTENSIONS = {"image/jpeg": "jpg", "image/png": "png", "image/gif": "gif", "image/webp": "webp", "image/avif": "avif"}
+
+
+@dataclass
+class StoredMedia:
+    key: str
+    sha256: str
+    size: int
+    content_type: str
+    # False when identical bytes were already stored and the upload was discarded,
+    # or (direct uploads) when the object is already known to media_objects
+    created: bool
+
+
+def sniff_image_type(head: bytes) -> Optional[tuple]:
+    """Return (extension, content_type) from the file's magic bytes, or None if not a supported image."""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "jpg", "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png", "image/png"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif", "image/gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp", "image/webp"
+    if head[4:8] == b"ftyp" and head[8:12] in (b"avif", b"avis"):
+        return "avif", "image/avif"
+    return None
+
+
+class _TempUpload:
+    """Blocking half of the pipeline; every method runs in the threadpool."""
+
+    def __init__(self):
+        fd, self.path = tempfile.mkstemp(dir=media_storage.staging_dir())
+        self.file = os.fdopen(fd, "wb")
+        self.digest = hashlib.sha256()
+
+    def write(self, chunk: bytes):
+        self.digest.update(chunk)
+        self.file.write(chunk)
+
+    def commit(self, key: str, content_type: str) -> bool:
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+        # Same hash, same bytes: an existing object is kept and the temp file dropped
+        return media_storage.put_file(key, self.path, content_type, overwrite=False)
+
+    def discard(self):
+        self.file.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+async def save_upload(upload: UploadFile) -> StoredMedia:
+    """Stream an uploaded image into the content-addressed store without blocking the event loop.
+
+    The body is read in chunks, size-limited, sniffed for a supported image
+    type and hashed while it is written to a temp file, which is then handed
+    to the storage backend as ``ab/cd/<sha256>.<sniffed extension>``.
+    Re-uploading bytes that are already stored costs no space.
+    """
+    temp = await run_in_threadpool(_TempUpload)
+    size = 0
+    detected = None
+    try:
+        while True:
+            chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            if detected is None:
+                detected = sniff_image_type(chunk)
+                if detected is None:
+                    raise HTTPException(status_code=415, detail="Unsupported image type")
+            size += len(chunk)
+            if size > settings.MAX_UPLOAD_SIZE:
+                raise HTTPException(status_code=413, detail=f"Image exceeds the {settings.MAX_UPLOAD_SIZE} byte limit")
+            await run_in_threadpool(temp.write, chunk)
+
+        if detected is None:
+            raise HTTPException(status_code=400, detail="Uploaded image is empty")
+
+        extension, content_type = detected
+        sha256 = temp.digest.hexdigest()
+        key = media_key(sha256, extension)
+        created = await run_in_threadpool(temp.commit, key, content_type)
+        logging.info(f"Image {'saved at' if created else 'deduplicated to'}: {key} ({size} bytes)")
+        return StoredMedia(key=key, sha256=sha256, size=size, content_type=content_type, created=created)
+    except BaseException:
+        await run_in_threadpool(temp.discard)
+        raise
+
+
+async def acquire_media(db: AsyncSession, stored: StoredMedia, references: int = 1):
+    """Count ``references`` more references to ``stored``; runs in the caller's transaction."""
+    now = datetime.now()
+    statement = dialect_insert(db, MediaObject).values(
+        sha256=stored.sha256, key=stored.key, content_type=stored.content_type,
+        size=stored.size, ref_count=references, created_on=now, updated_on=now,
+    )
+    await db.execute(statement.on_conflict_do_update(
+        index_elements=[MediaObject.sha256],
+        set_={"ref_count": MediaObject.ref_count + references, "updated_on": now},
+    ))
+
+
+async def release_media(db: AsyncSession, name: Optional[str]) -> Optional[str]:
+    """Drop one reference to ``name`` in the caller's transaction.
+
+    Content-addressed objects are never unlinked here, since another upload may
+    be about to reuse them; at ref_count 0 they are left for collection.
+    Legacy per-blog files are returned so the caller can delete them after commit.
+    """
+    if not name:
+        return None
+    if not is_content_addressed(name):
+        return name
+    await db.execute(
+        update(MediaObject)
+        .where(MediaObject.key == name, MediaObject.ref_count > 0)
+        .values(ref_count=MediaObject.ref_count - 1, updated_on=datetime.now())
+    )
+    return None
+
+
+def _remove_file(name: str):
+    media_storage.delete(media_relpath(name))
+    remove_derivatives(name)
+
+
+async def delete_media(filename: Optional[str]):
+    if not filename:
+        return
+    try:
+        await run_in_threadpool(_remove_file, filename)
+        logging.info(f"Image {filename} deleted successfully.")
+    except Exception as e:
+        logging.error(f"Failed to delete image {filename}: {str(e)}")
+
+
+def presign_upload(sha256: str, content_type: str, size: int) -> dict:
+    """Let a client upload straight to the storage backend; the API only signs the request.
+
+    The key is derived from the sha256 the client declares, and the backend
+    rejects a body that does not match it, so the store stays content-addressed.
+    """
+    extension = IMAGE_EXTENSIONS.get(content_type)
+    if extension is None:
+        raise HTTPException(status_code=415, detail="Unsupported image type")
+    if size <= 0 or size > settings.MAX_UPLOAD_SIZE:
+        raise HTTPException(status_code=413, detail=f"Image exceeds the {settings.MAX_UPLOAD_SIZE} byte limit")
+    key = media_key(sha256.lower(), extension)
+    if not is_content_addressed(key):
+        raise HTTPException(status_code=400, detail="sha256 must be 64 hex characters")
+    if media_storage.exists(key):
+        # Already stored: the client can reference the key without uploading anything
+        return {"key": key, "upload": None}
+    upload = media_storage.presigned_put(key, content_type, sha256.lower(), size, settings.MEDIA_PRESIGN_TTL)
+    if upload is None:
+        raise HTTPException(status_code=501, detail="Direct uploads are not supported by the configured media storage")
+    return {"key": key, "upload": upload}
+
+
+def _check_direct_upload(key: str) -> StoredMedia:
+    if not is_content_addressed(key):
+        raise HTTPException(status_code=400, detail="Invalid image key")
+    size = media_storage.size(key)
+    if size is None:
+        raise HTTPException(status_code=400, detail="Image has not been uploaded")
+    detected = sniff_image_type(media_storage.read_range(key, 0, 32))
+    if detected is None or not key.endswith(f".{detected[0]}") or size > settings.MAX_UPLOAD_SIZE:
+        # The signature pinned hash and length but not the bytes' type; do not keep a mislabelled object
+        media_storage.delete(key)
+        raise HTTPException(status_code=415, detail="Unsupported image type")
+    sha256 = os.path.splitext(os.path.basename(key))[0]
+    return StoredMedia(key=key, sha256=sha256, size=size, content_type=detected[1], created=True)
+
+
+async def verify_direct_upload(db: AsyncSession, key: str) -> StoredMedia:
+    """Check an object a client uploaded through presign_upload before a row may reference it.
+
+    ``created`` is only set the first time the object is referenced; a key that
+    presign_upload reported as already stored, or a re-used one, is not new.
+    """
+    stored = await run_in_threadpool(_check_direct_upload, key)
+    known = await db.scalar(select(MediaObject.sha256).where(MediaObject.sha256 == stored.sha256))
+    stored.created = known is None
+    return stored
@@ -0,0 +1,208 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, FrozenSet, List, Optional
+from app.core.config import settings
+from app.core.logging import logging
+from app.core.storage import get_media_storage, media_storage
+from app.utils.media_keys import media_relpath
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # pragma: no cover - Pillow is optional, originals are served as-is without it
+    Image = None
+
+# Derivatives of <key> are stored under derived/<key>/<width>.<ext>;
+# full.<ext> is a same-size transcode, written when the original is not wider than the largest width.
+# variants.json lists what was rendered and is written last, so its absence means "not rendered yet"
+DERIVED_PREFIX = "derived"
+FULL_SIZE = "full"
+MANIFEST = "variants.json"
+
+# Encoder effort for AVIF: 0 is slowest/smallest, 10 fastest
+AVIF_SPEED = 8
+
+CONTENT_TYPES = {"avif": "image/avif", "webp": "image/webp", "jpg": "image/jpeg", "png": "image/png"}
+PIL_FORMATS = {"avif": "AVIF", "webp": "WEBP", "jpg": "JPEG", "png": "PNG"}
+
+
+def _save(image, path: str, extension: str, quality: int):
+    options = {
+        "avif": {"quality": quality, "speed": AVIF_SPEED},
+        "webp": {"quality": quality, "method": 4},
+        "jpg": {"quality": quality, "optimize": True, "progressive": True},
+        "png": {"optimize": True},
+    }[extension]
+    image.save(path, PIL_FORMATS[extension], **options)
+
+
+def render_derivatives(storage_url: Optional[str], key: str, widths: List[int], formats: List[str], quality: int) -> dict:
+    """Worker-process entry point: render every width/format variant of ``key`` and store it under derived/<key>/."""
+    started = time.process_time()
+    storage = get_media_storage(storage_url)
+    with storage.local_copy(key) as source, tempfile.TemporaryDirectory(dir=storage.staging_dir()) as target_dir:
+        written = _render(source, target_dir, widths, formats, quality)
+        # Each variant is moved (local) or uploaded (object store) into place individually
+        for name in written:
+            extension = os.path.splitext(name)[1][1:]
+            storage.put_file(f"{derivative_prefix(key)}/{name}", os.path.join(target_dir, name), CONTENT_TYPES[extension])
+        manifest = os.path.join(target_dir, MANIFEST)
+        with open(manifest, "w") as file:
+            json.dump({"variants": written}, file)
+        storage.put_file(f"{derivative_prefix(key)}/{MANIFEST}", manifest, "application/json")
+    return {"files": len(written), "cpu_seconds": time.process_time() - started}
+
+
+def _render(source: str, target_dir: str, widths: List[int], formats: List[str], quality: int) -> List[str]:
+    largest = max(widths)
+    written = []
+    with Image.open(source) as original:
+        # Let the JPEG decoder downscale by 1/2..1/8 while decoding when the source is much larger
+        original.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(original)
+        has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+        image = image.convert("RGBA" if has_alpha else "RGB")
+
+    # Clients that accept neither modern format get a resized copy in a classic one
+    fallback = "png" if has_alpha else "jpg"
+    source_width, source_height = image.size
+    current = image
+    for width in sorted(set(widths), reverse=True):
+        target_width = min(width, source_width)
+        if target_width != current.width:
+            # Downscale from the previous (larger) variant rather than the original, much cheaper
+            target_height = max(1, round(source_height * target_width / source_width))
+            current = current.resize((target_width, target_height), Image.LANCZOS, reducing_gap=3.0)
+        for extension in formats + [fallback]:
+            written.append(f"{width}.{extension}")
+            _save(current, os.path.join(target_dir, written[-1]), extension, quality)
+
+    if source_width <= largest:
+        for extension in formats:
+            written.append(f"{FULL_SIZE}.{extension}")
+            _save(image, os.path.join(target_dir, written[-1]), extension, quality)
+
+    return written
+
+
+class DerivativeStats:
+    def __init__(self):
+        self.scheduled = 0
+        self.generated = 0
+        self.failed = 0
+        self.files = 0
+        self.cpu_seconds = 0.0
+
+    def stats(self) -> dict:
+        return {
+            "enabled": derivatives_enabled(),
+            "formats": available_formats(),
+            "scheduled": self.scheduled,
+            "generated": self.generated,
+            "failed": self.failed,
+            "in_flight": len(_pending),
+            "files": self.files,
+            "cpu_ms": round(self.cpu_seconds * 1000, 3),
+        }
+
+
+derivative_stats = DerivativeStats()
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pending: set = set()
+
+
+def available_formats() -> List[str]:
+    if Image is None:
+        return []
+    return [extension for extension in settings.IMAGE_DERIVATIVE_FORMATS
+            if extension in PIL_FORMATS and features.check(extension)]
+
+
+def derivatives_enabled() -> bool:
+    return Image is not None and bool(settings.IMAGE_DERIVATIVE_WIDTHS)
+
+
+def derivative_prefix(filename: str) -> str:
+    return f"{DERIVED_PREFIX}/{media_relpath(filename)}"
+
+
+def rendered_variants(filename: str) -> Optional[FrozenSet[str]]:
+    """Names of the variants rendered for ``filename`` (e.g. "320.webp"), or None until rendering has finished."""
+    # Blocking; callers run it in the threadpool
+    manifest = media_storage.read(f"{derivative_prefix(filename)}/{MANIFEST}")
+    return None if manifest is None else frozenset(json.loads(manifest)["variants"])
+
+
+def snap_width(requested: int) -> int:
+    # Only configured widths exist on disk; round up so the client never gets less than it asked for
+    widths = sorted(settings.IMAGE_DERIVATIVE_WIDTHS)
+    return next((width for width in widths if width >= requested), widths[-1])
+
+
+def derivative_urls(base_url: str, filename: Optional[str]) -> Optional[Dict[str, str]]:
+    """Width -> URL of the negotiated variant, e.g. {"320": ".../media/x.jpg?w=320"}."""
+    if not filename or not derivatives_enabled():
+        return None
+    return {str(width): f"{base_url}media/{filename}?w={width}" for width in sorted(settings.IMAGE_DERIVATIVE_WIDTHS)}
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn: forking a process that runs an event loop and threadpool is not safe
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.IMAGE_DERIVATIVE_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _pool
+
+
+def _on_done(filename: str, future: asyncio.Future):
+    _pending.discard(future)
+    if future.cancelled():
+        return
+    error = future.exception()
+    if error is not None:
+        derivative_stats.failed += 1
+        logging.error(f"Failed to generate derivatives for {filename}: {str(error)}")
+        return
+    result = future.result()
+    derivative_stats.generated += 1
+    derivative_stats.files += result["files"]
+    derivative_stats.cpu_seconds += result["cpu_seconds"]
+    logging.info(f"Generated {result['files']} derivatives for {filename}.")
+
+
+def schedule_derivatives(filename: Optional[str]) -> Optional[asyncio.Future]:
+    """Queue derivative generation for a stored image; the request does not wait for it."""
+    if not filename or not derivatives_enabled():
+        return None
+    future = asyncio.get_running_loop().run_in_executor(
+        _get_pool(),
+        render_derivatives,
+        settings.MEDIA_STORAGE_URL,
+        media_relpath(filename),
+        list(settings.IMAGE_DERIVATIVE_WIDTHS),
+        available_formats(),
+        settings.IMAGE_DERIVATIVE_QUALITY,
+    )
+    derivative_stats.scheduled += 1
+    _pending.add(future)
+    future.add_done_callback(lambda done: _on_done(filename, done))
+    return future
+
+
+def remove_derivatives(filename: str):
+    # Blocking; callers run it in the threadpool
+    media_storage.delete_prefix(f"{derivative_prefix(filename)}/")
+
+
+def shutdown_derivative_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
@@ -0,0 +1,312 @@
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Dict, List, Optional, Set, Tuple
+from sqlalchemy import delete, func, or_, select
+from starlette.concurrency import run_in_threadpool
+from app.core.cache import blog_detail_cache
+from app.core.config import settings
+from app.core.database import async_session
+from app.core.logging import logging
+from app.core.storage import media_storage
+from app.models.blog import Blog
+from app.models.media import MediaObject
+from app.services.media import release_media
+from app.services.media_derivatives import DERIVED_PREFIX, remove_derivatives
+from app.utils.media_keys import is_content_addressed
+
+# Orphans are moved here instead of deleted when quarantine is on; the walk is told to skip it
+QUARANTINE_PREFIX = "quarantine"
+# LocalStorage's staging directory; files left there by a crashed upload or render are garbage
+STAGING_PREFIX = ".tmp"
+
+
+class MediaGCStats:
+    def __init__(self):
+        self.passes = 0
+        self.batches = 0
+        self.scanned = 0
+        self.orphans = 0
+        self.orphan_bytes = 0
+        self.deleted = 0
+        self.quarantined = 0
+        self.reclaimed_bytes = 0
+        self.expired_images = 0
+        self.would_expire_images = 0
+        self.failed = 0
+        self.cursor: Optional[str] = None
+        self.pass_started: Optional[float] = None
+        self.last_pass_seconds: Optional[float] = None
+
+    def stats(self) -> dict:
+        return {
+            "enabled": settings.MEDIA_GC_ENABLED,
+            "dry_run": settings.MEDIA_GC_DRY_RUN,
+            "quarantine": settings.MEDIA_GC_QUARANTINE,
+            "passes": self.passes,
+            "batches": self.batches,
+            "scanned": self.scanned,
+            "orphans": self.orphans,
+            "orphan_bytes": self.orphan_bytes,
+            "deleted": self.deleted,
+            "quarantined": self.quarantined,
+            "reclaimed_bytes": self.reclaimed_bytes,
+            "expired_images": self.expired_images,
+            "would_expire_images": self.would_expire_images,
+            "failed": self.failed,
+            "cursor": self.cursor,
+            "pass_seconds": round(time.monotonic() - self.pass_started, 3) if self.pass_started else None,
+            "last_pass_seconds": self.last_pass_seconds,
+        }
+
+
+media_gc_stats = MediaGCStats()
+
+_task: Optional[asyncio.Task] = None
+
+
+def _next_batch(start_after: Optional[str], size: int) -> List[Tuple[str, int, float]]:
+    # A fresh listing per batch: nothing (scandir handles, S3 pages) is held open between batches
+    return list(islice(media_storage.iter_keys(start_after, exclude=(QUARANTINE_PREFIX,)), size))
+
+
+def _derived_original(key: str) -> str:
+    # derived/<original key>/<width>.<ext> -> <original key>
+    return key[len(DERIVED_PREFIX) + 1:].rsplit("/", 1)[0]
+
+
+async def _referenced(names: List[str], cutoff: datetime) -> Set[str]:
+    """Names in ``names`` that a blog row or a live (or recently touched) media_objects row points at."""
+    async with async_session() as session:
+        blogs = await session.execute(select(Blog.image).where(Blog.image.in_(names)))
+        referenced = set(blogs.scalars())
+        objects = await session.execute(
+            select(MediaObject.key).where(
+                MediaObject.key.in_(names),
+                or_(MediaObject.ref_count > 0, MediaObject.updated_on >= cutoff),
+            )
+        )
+        referenced.update(objects.scalars())
+    return referenced
+
+
+async def _claim(keys: List[str], cutoff: datetime) -> Set[str]:
+    """Drop the media_objects rows of unreferenced content-addressed keys before their files go.
+
+    The delete repeats the ref_count/updated_on conditions, so an upload that
+    acquired the object after it was classified keeps both the row and the file.
+    """
+    hashed = [key for key in keys if is_content_addressed(key)]
+    if not hashed:
+        return set(keys)
+    async with async_session() as session:
+        rows = await session.execute(
+            select(MediaObject.key).where(MediaObject.key.in_(hashed))
+        )
+        tracked = set(rows.scalars())
+        result = await session.execute(
+            delete(MediaObject)
+            .where(MediaObject.key.in_(tracked), MediaObject.ref_count == 0, MediaObject.updated_on < cutoff)
+            .returning(MediaObject.key)
+        )
+        claimed = set(result.scalars())
+        await session.commit()
+    return {key for key in keys if key not in tracked or key in claimed}
+
+
+def _still_stale(key: str, cutoff: float) -> bool:
+    # A deduplicated upload touches the object, so re-check right before it is removed
+    modified = media_storage.modified(key)
+    return modified is not None and modified < cutoff
+
+
+def _remove(key: str, quarantine: bool, stamp: str, derived: bool):
+    if derived:
+        media_storage.delete(key)
+    elif quarantine:
+        media_storage.move(key, f"{QUARANTINE_PREFIX}/{stamp}/{key}")
+        remove_derivatives(key)
+    else:
+        media_storage.delete(key)
+        remove_derivatives(key)
+
+
+async def collect_batch(start_after: Optional[str] = None, dry_run: bool = True, quarantine: bool = False,
+                        batch_size: Optional[int] = None, grace_seconds: Optional[int] = None) -> Optional[str]:
+    """Sweep the next ``batch_size`` stored keys after ``start_after``; returns the cursor, None at the end of a pass.
+
+    A stored file is an orphan when it is older than the grace period and no
+    blog row or live media_objects row references it. Derivatives are orphans
+    once their original is gone, and stale staging files always are.
+    """
+    batch_size = batch_size or settings.MEDIA_GC_BATCH_SIZE
+    grace_seconds = settings.MEDIA_GC_GRACE_SECONDS if grace_seconds is None else grace_seconds
+    batch = await run_in_threadpool(_next_batch, start_after, batch_size)
+    if not batch:
+        return None
+
+    media_gc_stats.batches += 1
+    media_gc_stats.scanned += len(batch)
+    cutoff = time.time() - grace_seconds
+    # media_objects timestamps are naive local time, as written by acquire_media/release_media
+    cutoff_on = datetime.now() - timedelta(seconds=grace_seconds)
+
+    originals: Dict[str, int] = {}
+    staging: Dict[str, int] = {}
+    derived: Dict[str, int] = {}
+    for key, size, mtime in batch:
+        # Anything touched inside the grace period may belong to a request still in flight
+        if mtime >= cutoff or key.startswith(f"{QUARANTINE_PREFIX}/"):
+            continue
+        if key.startswith(f"{STAGING_PREFIX}/"):
+            staging[key] = size
+        elif key.startswith(f"{DERIVED_PREFIX}/"):
+            derived[key] = size
+        else:
+            originals[key] = size
+
+    orphans: Dict[str, int] = dict(staging)
+    if originals:
+        referenced = await _referenced(list(originals), cutoff_on)
+        orphans.update({key: size for key, size in originals.items() if key not in referenced})
+    if derived:
+        parents = {_derived_original(key) for key in derived}
+        missing = {parent for parent in parents
+                   if parent in orphans or not await run_in_threadpool(media_storage.exists, parent)}
+        orphans.update({key: size for key, size in derived.items() if _derived_original(key) in missing})
+
+    media_gc_stats.orphans += len(orphans)
+    media_gc_stats.orphan_bytes += sum(orphans.values())
+    if dry_run:
+        for key, size in orphans.items():
+            logging.info(f"Media GC (dry run) would remove {key} ({size} bytes)")
+        return batch[-1][0]
+
+    removable = set(staging)
+    removable.update(key for key in orphans if key in derived)
+    removable.update(await _claim([key for key in orphans if key in originals], cutoff_on))
+    stamp = datetime.now().strftime("%Y%m%d")
+    for key in removable:
+        is_original = key in originals
+        try:
+            if is_original and not await run_in_threadpool(_still_stale, key, cutoff):
+                continue
+            keep = quarantine and is_original
+            await run_in_threadpool(_remove, key, keep, stamp, key in derived)
+        except Exception as e:
+            media_gc_stats.failed += 1
+            logging.error(f"Media GC failed to remove {key}: {str(e)}")
+            continue
+        if keep:
+            media_gc_stats.quarantined += 1
+        else:
+            media_gc_stats.deleted += 1
+            media_gc_stats.reclaimed_bytes += orphans[key]
+        logging.info(f"Media GC {'quarantined' if keep else 'deleted'} {key} ({orphans[key]} bytes)")
+    return batch[-1][0]
+
+
+async def expire_inactive_images(retention_seconds: int, dry_run: bool = True) -> int:
+    """Detach images from blogs soft-deleted longer than ``retention_seconds`` ago.
+
+    The files are not touched here; once released they are ordinary orphans
+    and a later pass collects them after the grace period. Returns how many
+    were detached, or in a dry run how many would have been.
+    """
+    cutoff = datetime.now() - timedelta(seconds=retention_seconds)
+    query = (
+        select(Blog)
+        .where(Blog.is_active == False, Blog.image.is_not(None),
+               func.coalesce(Blog.updated_on, Blog.created_on) < cutoff)
+        .order_by(Blog.id)
+        .limit(settings.MEDIA_GC_BATCH_SIZE)
+    )
+    expired = 0
+    last_id = 0
+    async with async_session() as session:
+        while True:
+            blogs = (await session.execute(query.where(Blog.id > last_id))).scalars().all()
+            if not blogs:
+                break
+            last_id = blogs[-1].id
+            expired += len(blogs)
+            if dry_run:
+                for blog in blogs:
+                    logging.info(f"Media GC (dry run) would detach {blog.image} from inactive blog {blog.blog_id}")
+                continue
+            for blog in blogs:
+                await release_media(session, blog.image)
+                blog.image = None
+            await session.commit()
+            # Cached detail payloads still carry the detached image
+            for blog in blogs:
+                await blog_detail_cache.delete(blog.id)
+    if dry_run:
+        media_gc_stats.would_expire_images += expired
+    else:
+        media_gc_stats.expired_images += expired
+    return expired
+
+
+async def run_pass(dry_run: bool, quarantine: bool) -> int:
+    """One full walk of the media store; returns the number of keys scanned."""
+    media_gc_stats.pass_started = time.monotonic()
+    scanned = media_gc_stats.scanned
+    if settings.MEDIA_GC_INACTIVE_RETENTION_SECONDS is not None:
+        await expire_inactive_images(settings.MEDIA_GC_INACTIVE_RETENTION_SECONDS, dry_run)
+    cursor = None
+    while True:
+        cursor = await collect_batch(cursor, dry_run, quarantine)
+        media_gc_stats.cursor = cursor
+        if cursor is None:
+            break
+        # Spread the walk out so the store and the database never see a burst
+        await asyncio.sleep(settings.MEDIA_GC_BATCH_DELAY)
+    media_gc_stats.passes += 1
+    media_gc_stats.last_pass_seconds = round(time.monotonic() - media_gc_stats.pass_started, 3)
+    media_gc_stats.pass_started = None
+    return media_gc_stats.scanned - scanned
+
+
+async def _run_forever():
+    while True:
+        try:
+            scanned = await run_pass(settings.MEDIA_GC_DRY_RUN, settings.MEDIA_GC_QUARANTINE)
+            logging.info(f"Media GC pass finished: {scanned} keys scanned.")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            media_gc_stats.failed += 1
+            media_gc_stats.pass_started = None
+            logging.error(f"Media GC pass failed: {str(e)}")
+        await asyncio.sleep(settings.MEDIA_GC_INTERVAL)
+
+
+def start_media_gc():
+    """Start the background collector if MEDIA_GC_ENABLED; run it on one instance only."""
+    global _task
+    if settings.MEDIA_GC_ENABLED and _task is None:
+        _task = asyncio.get_running_loop().create_task(_run_forever())
+
+
+async def stop_media_gc():
+    global _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
+
+
+if __name__ == "__main__":
+    # One pass from the command line: python -m app.services.media_gc [--delete] [--quarantine]
+    parser = argparse.ArgumentParser(description="Collect media files no blog references.")
+    parser.add_argument("--delete", action="store_true", help="remove orphans (default is a dry run)")
+    parser.add_argument("--quarantine", action="store_true", help=f"move orphans under {QUARANTINE_PREFIX}/ instead")
+    args = parser.parse_args()
+    asyncio.run(run_pass(dry_run=not (args.delete or args.quarantine), quarantine=args.quarantine))
+    print(media_gc_stats.stats())
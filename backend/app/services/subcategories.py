@@ -4,40 +4,57 @@ from fastapi import HTTPException
 from app.models.subcategories import Subcategory
 from app.schemas.subcategories import SubcategoryCreateModel, SubcategoryUpdateModel
 from app.core.logging import logging
+from app.core.cache import blog_detail_cache
+from app.core.config import settings
+from app.core.id_allocator import HiLoIdAllocator
+from app.core.database import dialect_insert
+from app.services.taxonomy import bump_taxonomy_version, taxonomy
 from app.models.categories import *
 
-async def generate_subcat_id(db: AsyncSession) -> str:
+subcat_id_allocator = HiLoIdAllocator("subcat", "subcat", Subcategory.id, block_size=settings.ID_BLOCK_SIZE)
+
+async def generate_subcat_id() -> str:
     try:
-        # Get the last inserted Subcategory ID
-        result = await db.execute(select(func.max(Subcategory.id)))
-        max_id = result.scalar_one_or_none()
-        new_id = (max_id + 1) if max_id is not None else 1
-        return f"subcat_{new_id}"
+        return await subcat_id_allocator.next_id()
     except Exception as e:
         logging.error(f"Error generating subcategory ID: {str(e)}")
         raise HTTPException(status_code=500, detail="Error generating subcategory ID")
 
 async def create_subcategory(db: AsyncSession, subcategory_data: SubcategoryCreateModel):
     try:
-        subcategories = []
-        for name in subcategory_data.names:
-            new_subcat_id = await generate_subcat_id(db)
-            new_subcategory = Subcategory(
-                category_id=subcategory_data.category_id,
-                subcat_id=new_subcat_id,
-                name=name,
-                is_active=subcategory_data.is_active,
-            )
-            db.add(new_subcategory)
-            subcategories.append(new_subcategory)
-
+        # Drop duplicates within the request while keeping the caller's order
+        names = list(dict.fromkeys(subcategory_data.names))
+        if not names:
+            return [], []
+        subcat_ids = await subcat_id_allocator.next_ids(len(names))
+
+        # One multi-row INSERT; names that already exist are skipped by the conflict clause
+        result = await db.scalars(
+            dialect_insert(db, Subcategory)
+            .values([
+                {
+                    "category_id": subcategory_data.category_id,
+                    "subcat_id": subcat_id,
+                    "name": name,
+                    "is_active": subcategory_data.is_active,
+                }
+                for subcat_id, name in zip(subcat_ids, names)
+            ])
+            .on_conflict_do_nothing(index_elements=[Subcategory.name])
+            .returning(Subcategory)
+        )
+        created = {subcategory.name: subcategory for subcategory in result.all()}
+        if created:
+            await bump_taxonomy_version(db)
         await db.commit()
-        for subcategory in subcategories:
-            await db.refresh(subcategory)
+        taxonomy.invalidate()
 
-        logging.info(f"Successfully created {len(subcategories)} subcategories.")
-        return subcategories
+        subcategories = [created[name] for name in names if name in created]
+        skipped = [name for name in names if name not in created]
+        logging.info(f"Successfully created {len(subcategories)} subcategories, skipped {len(skipped)} existing.")
+        return subcategories, skipped
     except Exception as e:
+        await db.rollback()
         logging.error(f"Failed to create subcategories: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail="Failed to create subcategories")
 
@@ -88,10 +105,16 @@ async def update_subcategory(db: AsyncSession, subcategory_id: int, subcategory_
         if subcategory_data.is_active is not None:
             subcategory.is_active = subcategory_data.is_active
 
+        await bump_taxonomy_version(db)
         # Commit changes to the database
         await db.commit()
+        taxonomy.invalidate()
         await db.refresh(subcategory)
 
+        # Cached blog details embed the subcategory and category names
+        if subcategory_data.name is not None or subcategory_data.category_id is not None:
+            await blog_detail_cache.clear()
+
         logging.info(f"Subcategory with ID {subcategory_id} updated successfully.")
         return subcategory
     except Exception as e:
@@ -108,7 +131,9 @@ async def soft_delete_subcategory(db: AsyncSession, subcategory_id: int):
 
         # Set is_active to False for soft delete
         subcategory.is_active = False
+        await bump_taxonomy_version(db)
         await db.commit()
+        taxonomy.invalidate()
         await db.refresh(subcategory)
 
         logging.info(f"Subcategory with ID {subcategory_id} soft deleted successfully.")
@@ -0,0 +1,168 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Dict, FrozenSet, Iterable, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.database import async_session, dialect_insert
+from app.core.logging import logging
+from app.models.categories import Category
+from app.models.id_sequences import IdSequence
+from app.models.subcategories import Subcategory
+
+# id_sequences row whose next_value is the taxonomy version; every category or
+# subcategory write bumps it in the same transaction
+VERSION_ROW = "taxonomy"
+
+
+@dataclass(frozen=True)
+class TaxonomyCategory:
+    id: int
+    name: str
+    is_active: bool
+
+
+@dataclass(frozen=True)
+class TaxonomySubcategory:
+    id: int
+    name: str
+    category_id: Optional[int]
+    is_active: bool
+
+
+@dataclass(frozen=True)
+class TaxonomySnapshot:
+    """All categories and subcategories (active or not) as of ``version``; never mutated once built."""
+
+    version: int
+    categories: Dict[int, TaxonomyCategory] = field(default_factory=dict)
+    subcategories: Dict[int, TaxonomySubcategory] = field(default_factory=dict)
+
+    @cached_property
+    def uncategorized(self) -> FrozenSet[int]:
+        """Subcategories without an existing category; the old join left their blogs out of every listing."""
+        return frozenset(
+            subcategory.id for subcategory in self.subcategories.values()
+            if subcategory.category_id not in self.categories
+        )
+
+    def names(self, subcategory_id: Optional[int]) -> dict:
+        """category/subcategory id and name fields for a blog in ``subcategory_id``, as the old join produced them."""
+        subcategory = self.subcategories.get(subcategory_id)
+        category = self.categories.get(subcategory.category_id) if subcategory else None
+        return {
+            "category_id": category.id if category else None,
+            "category_name": category.name if category else None,
+            "subcategory_id": subcategory_id,
+            "subcategory_name": subcategory.name if subcategory else None,
+        }
+
+
+class TaxonomyCache:
+    """Per-worker copy of the category/subcategory tables.
+
+    The stored version is checked at most every ``check_interval`` seconds, and
+    the tables are reloaded only when it changed. A lookup that misses forces a
+    check first, so an id created on another worker a moment ago is not rejected.
+    Invalidations bump a generation counter, so one that lands while a check is
+    already reading the version is not lost when that check finishes.
+    """
+
+    def __init__(self, check_interval: float):
+        self.check_interval = check_interval
+        self.snapshot = TaxonomySnapshot(version=-1)
+        self._checked_at: Optional[float] = None
+        self._generation = 0
+        self._checked_generation = -1
+        self._lock = asyncio.Lock()
+        self.checks = 0
+        self.loads = 0
+
+    async def get(self) -> TaxonomySnapshot:
+        if (
+            self._checked_generation != self._generation
+            or time.monotonic() - self._checked_at >= self.check_interval
+        ):
+            await self._check(time.monotonic())
+        return self.snapshot
+
+    async def ensure(self, category_ids: Iterable[int] = (), subcategory_ids: Iterable[int] = ()) -> TaxonomySnapshot:
+        """A snapshot that contains the given ids, if they exist at all."""
+        category_ids, subcategory_ids = set(category_ids) - {None}, set(subcategory_ids) - {None}
+        snapshot = await self.get()
+        if category_ids <= snapshot.categories.keys() and subcategory_ids <= snapshot.subcategories.keys():
+            return snapshot
+        await self._check(time.monotonic())
+        return self.snapshot
+
+    def invalidate(self):
+        # The next get() checks the version; writers call this after committing a bump
+        self._generation += 1
+
+    async def _check(self, requested_at: float):
+        async with self._lock:
+            # Another task may have checked while this one waited for the lock
+            if self._checked_generation == self._generation and self._checked_at >= requested_at:
+                return
+            # Only invalidations up to here are covered: the version is read after they committed
+            generation = self._generation
+            async with async_session() as session:
+                self.checks += 1
+                version = await session.scalar(
+                    select(IdSequence.next_value).where(IdSequence.name == VERSION_ROW)
+                ) or 0
+                if version != self.snapshot.version:
+                    self.snapshot = await self._load(session, version)
+            self._checked_at = time.monotonic()
+            self._checked_generation = generation
+
+    async def _load(self, session: AsyncSession, version: int) -> TaxonomySnapshot:
+        categories = await session.execute(select(Category.id, Category.name, Category.is_active))
+        subcategories = await session.execute(
+            select(Subcategory.id, Subcategory.name, Subcategory.category_id, Subcategory.is_active)
+        )
+        snapshot = TaxonomySnapshot(
+            version=version,
+            categories={row.id: TaxonomyCategory(row.id, row.name, bool(row.is_active)) for row in categories},
+            subcategories={
+                row.id: TaxonomySubcategory(row.id, row.name, row.category_id, bool(row.is_active))
+                for row in subcategories
+            },
+        )
+        self.loads += 1
+        logging.info(
+            f"Loaded taxonomy v{version}: {len(snapshot.categories)} categories, "
+            f"{len(snapshot.subcategories)} subcategories."
+        )
+        return snapshot
+
+    def stats(self) -> dict:
+        return {
+            "version": self.snapshot.version,
+            "categories": len(self.snapshot.categories),
+            "subcategories": len(self.snapshot.subcategories),
+            "checks": self.checks,
+            "loads": self.loads,
+        }
+
+
+taxonomy = TaxonomyCache(check_interval=settings.TAXONOMY_CHECK_INTERVAL)
+
+
+async def bump_taxonomy_version(db: AsyncSession):
+    """Mark the taxonomy changed; runs in the writer's transaction so other workers see it with the write."""
+    await db.execute(
+        dialect_insert(db, IdSequence)
+        .values(name=VERSION_ROW, next_value=1)
+        .on_conflict_do_update(index_elements=[IdSequence.name], set_={"next_value": IdSequence.next_value + 1})
+    )
+
+
+async def load_taxonomy():
+    try:
+        await taxonomy.get()
+    except Exception as e:
+        # Not fatal: the first request that needs it loads it
+        logging.error(f"Failed to load taxonomy at startup: {str(e)}")
@@ -0,0 +1,264 @@
+import re
+from bisect import bisect_left, insort
+from collections import Counter
+from itertools import combinations
+from typing import Dict, List, Optional, Set, Tuple
+from fastapi import HTTPException
+from sqlalchemy import column, func, literal, literal_column, select, table
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.logging import logging
+from app.models.blog import Blog
+from app.services.taxonomy import taxonomy
+
+# pg_trgm's default word_similarity_threshold; fuzzy matches below it are not suggestions
+FUZZY_THRESHOLD = 0.6
+# Fuzzy title candidates fetched per wanted suggestion on SQLite, before scoring
+SQLITE_FUZZY_CANDIDATES = 5
+# Leading query trigrams the SQLite fuzzy lookup matches on; the MATCH costs grow with their square
+SQLITE_FUZZY_TRIGRAMS = 6
+MATCH_PREFIX = "prefix"
+MATCH_FUZZY = "fuzzy"
+WORD = re.compile(r"\w+")
+
+# The SQLite trigram FTS5 table (see app/models/blog.py); rowid is blog.id
+blog_title_trgm = table("blog_title_trgm", column("rowid"))
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def trigrams(text: str) -> Set[str]:
+    # Same shape as pg_trgm: each word padded with two spaces in front and one behind
+    grams = set()
+    for word in WORD.findall(text.lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def word_similarity(query: str, text: str) -> float:
+    # Share of the query's trigrams found in the best matching word of ``text`` (the whole of it for
+    # multi-word queries); close to pg_trgm's word_similarity, which scores typed fragments of long titles
+    wanted = trigrams(query)
+    if not wanted:
+        return 0.0
+    candidates = [text] if len(WORD.findall(query)) > 1 else WORD.findall(text)
+    return max((len(wanted & trigrams(candidate)) / len(wanted) for candidate in candidates), default=0.0)
+
+
+def prefix_upper_bound(prefix: str) -> str:
+    # The smallest string greater than every string that starts with ``prefix``
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class PrefixIndex:
+    """Sorted (normalized name, id) pairs over a set of names, updated in place as names change.
+
+    Prefix matches are anchored at the start of the name, like the blog title
+    range scan, so "py" finds "Python basics" but not "Learning Python"; the
+    latter comes back as a fuzzy match. Lookups are a bisect plus a walk over
+    the matches. Fuzzy lookups go through a trigram -> ids posting index, so only
+    names sharing enough trigrams with the query are scored.
+    """
+
+    def __init__(self):
+        self.names: Dict[int, str] = {}
+        self._entries: List[Tuple[str, int]] = []
+        self._word_grams: Dict[int, List[Set[str]]] = {}
+        self._postings: Dict[str, Set[int]] = {}
+
+    def _add(self, item_id: int, name: str):
+        self.names[item_id] = name
+        insort(self._entries, (normalize(name), item_id))
+        self._word_grams[item_id] = [trigrams(word) for word in WORD.findall(name)]
+        for gram in trigrams(name):
+            self._postings.setdefault(gram, set()).add(item_id)
+
+    def _remove(self, item_id: int):
+        name = self.names.pop(item_id)
+        position = bisect_left(self._entries, (normalize(name), item_id))
+        if position < len(self._entries) and self._entries[position] == (normalize(name), item_id):
+            del self._entries[position]
+        del self._word_grams[item_id]
+        for gram in trigrams(name):
+            self._postings[gram].discard(item_id)
+            if not self._postings[gram]:
+                del self._postings[gram]
+
+    def sync(self, names: Dict[int, str]) -> int:
+        """Bring the index in line with ``names``, touching only the ids that changed; returns how many did."""
+        changed = [item_id for item_id, name in self.names.items() if names.get(item_id) != name]
+        for item_id in changed:
+            self._remove(item_id)
+        added = [item_id for item_id in names if item_id not in self.names]
+        for item_id in added:
+            self._add(item_id, names[item_id])
+        return len(set(changed) | set(added))
+
+    def prefix(self, query: str, limit: int) -> List[int]:
+        query = normalize(query)
+        found: List[int] = []
+        position = bisect_left(self._entries, (query,))
+        while position < len(self._entries) and len(found) < limit:
+            key, item_id = self._entries[position]
+            if not key.startswith(query):
+                break
+            found.append(item_id)
+            position += 1
+        return found
+
+    def fuzzy(self, query: str, limit: int, exclude: Set[int]) -> List[int]:
+        wanted = trigrams(query)
+        if not wanted:
+            return []
+        # Trigrams shared with the whole name bound the word_similarity from above
+        shared = Counter(item_id for gram in wanted for item_id in self._postings.get(gram, ()))
+        whole_name = len(WORD.findall(query)) > 1
+        scored = []
+        for item_id, count in shared.items():
+            if item_id in exclude or count / len(wanted) < FUZZY_THRESHOLD:
+                continue
+            if whole_name:
+                score = word_similarity(query, self.names[item_id])
+            else:
+                score = max(len(wanted & grams) for grams in self._word_grams[item_id]) / len(wanted)
+            if score >= FUZZY_THRESHOLD:
+                scored.append((score, item_id))
+        scored.sort(key=lambda entry: (-entry[0], entry[1]))
+        return [item_id for _, item_id in scored[:limit]]
+
+
+class TaxonomyTypeahead:
+    """Prefix/fuzzy indexes over active category and subcategory names, following the taxonomy cache.
+
+    Each taxonomy version change is applied as a diff, so a write only re-indexes the rows it touched.
+    """
+
+    def __init__(self):
+        self.categories = PrefixIndex()
+        self.subcategories = PrefixIndex()
+        self.version: Optional[int] = None
+        self.syncs = 0
+        self.reindexed = 0
+
+    async def get(self) -> "TaxonomyTypeahead":
+        snapshot = await taxonomy.get()
+        if snapshot.version != self.version:
+            self.reindexed += self.categories.sync(
+                {category.id: category.name for category in snapshot.categories.values() if category.is_active}
+            )
+            self.reindexed += self.subcategories.sync({
+                subcategory.id: subcategory.name for subcategory in snapshot.subcategories.values()
+                if subcategory.is_active
+            })
+            self.version = snapshot.version
+            self.syncs += 1
+        return self
+
+    def stats(self) -> dict:
+        return {
+            "version": self.version,
+            "categories": len(self.categories.names),
+            "subcategories": len(self.subcategories.names),
+            "syncs": self.syncs,
+            "reindexed": self.reindexed,
+        }
+
+
+taxonomy_typeahead = TaxonomyTypeahead()
+
+
+def suggest(index: PrefixIndex, query: str, limit: int) -> List[Tuple[int, str]]:
+    matches = [(item_id, MATCH_PREFIX) for item_id in index.prefix(query, limit)]
+    if len(matches) < limit:
+        exclude = {item_id for item_id, _ in matches}
+        matches += [(item_id, MATCH_FUZZY) for item_id in index.fuzzy(query, limit - len(matches), exclude)]
+    return matches
+
+
+async def suggest_blog_titles(db: AsyncSession, query: str, limit: int) -> List[dict]:
+    """Active blog titles starting with ``query``, then the closest fuzzy matches."""
+    query = normalize(query)
+    postgres = db.bind.dialect.name == "postgresql"
+    title = func.lower(Blog.title)
+
+    # A range scan of ix_blog_title_prefix, already in the order it is returned
+    sort_key = title.collate("C") if postgres else title
+    prefix_rows = (await db.execute(
+        select(Blog.id, Blog.blog_id, Blog.title, Blog.subcategory_id)
+        .where(sort_key >= query, sort_key < prefix_upper_bound(query), Blog.is_active == True)
+        .order_by(sort_key)
+        .limit(limit)
+    )).all()
+    results = [{**row._mapping, "match": MATCH_PREFIX} for row in prefix_rows]
+    if len(results) >= limit or len(WORD.findall(query)) == 0:
+        return results
+
+    seen = [row.id for row in prefix_rows]
+    remaining = limit - len(results)
+    if postgres:
+        # Nearest first straight off the GiST trigram index (ix_blog_title_trgm): <% is the
+        # word_similarity match and <<-> its distance
+        fuzzy_rows = (await db.execute(
+            select(Blog.id, Blog.blog_id, Blog.title, Blog.subcategory_id)
+            .where(literal(query).op("<%")(title), Blog.is_active == True, Blog.id.not_in(seen))
+            .order_by(literal(query).op("<<->")(title))
+            .limit(remaining)
+        )).all()
+    else:
+        # Titles containing all but one of the query's leading trigrams (one typo), streamed off the
+        # FTS5 posting lists without ranking every match; candidates are scored here instead
+        grams = list(dict.fromkeys(
+            word[i:i + 3] for word in WORD.findall(query) for i in range(len(word) - 2)
+        ))[:SQLITE_FUZZY_TRIGRAMS]
+        if not grams:
+            return results
+        groups = [grams] if len(grams) <= 2 else combinations(grams, len(grams) - 1)
+        trgm = literal_column("blog_title_trgm")
+        candidates = (await db.execute(
+            select(Blog.id, Blog.blog_id, Blog.title, Blog.subcategory_id)
+            .select_from(blog_title_trgm)
+            .join(Blog, Blog.id == blog_title_trgm.c.rowid)
+            .where(trgm.op("MATCH")(" OR ".join("(" + " AND ".join(f'"{gram}"' for gram in group) + ")" for group in groups)),
+                   Blog.is_active == True, Blog.id.not_in(seen))
+            .limit(remaining * SQLITE_FUZZY_CANDIDATES)
+        )).all()
+        scored = sorted(
+            ((word_similarity(query, row.title), row) for row in candidates),
+            key=lambda entry: (-entry[0], entry[1].id),
+        )
+        fuzzy_rows = [row for score, row in scored if score >= FUZZY_THRESHOLD][:remaining]
+    return results + [{**row._mapping, "match": MATCH_FUZZY} for row in fuzzy_rows]
+
+
+async def typeahead(db: AsyncSession, query: str, limit: int = 5) -> dict:
+    try:
+        if not normalize(query):
+            return {"categories": [], "subcategories": [], "blogs": []}
+        index = await taxonomy_typeahead.get()
+        categories = [
+            {"id": item_id, "name": index.categories.names[item_id], "match": match}
+            for item_id, match in suggest(index.categories, query, limit)
+        ]
+        snapshot = taxonomy.snapshot
+        subcategories = [
+            {
+                "id": item_id,
+                "name": index.subcategories.names[item_id],
+                "category_id": snapshot.subcategories[item_id].category_id,
+                "match": match,
+            }
+            for item_id, match in suggest(index.subcategories, query, limit)
+            if item_id in snapshot.subcategories
+        ]
+        blogs = await suggest_blog_titles(db, query, limit)
+        logging.info(
+            f"Typeahead for '{query}': {len(categories)} categories, {len(subcategories)} subcategories, {len(blogs)} blogs."
+        )
+        return {"categories": categories, "subcategories": subcategories, "blogs": blogs}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error building typeahead for '{query}': {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to fetch suggestions")
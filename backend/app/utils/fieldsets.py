@@ -0,0 +1,17 @@
+from typing import List, Optional, Sequence
+from fastapi import HTTPException
+
+VIEW_FULL = "full"
+VIEW_SUMMARY = "summary"
+
+
+def resolve_fields(fields: Optional[str], view: str, allowed: Sequence[str], summary: Sequence[str]) -> List[str]:
+    # An explicit comma separated ?fields= list wins over the named view
+    if fields:
+        requested = {field.strip() for field in fields.split(",") if field.strip()}
+        unknown = sorted(requested - set(allowed))
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+        # Keep the canonical response order regardless of how the client listed them
+        return [field for field in allowed if field in requested]
+    return list(summary if view == VIEW_SUMMARY else allowed)
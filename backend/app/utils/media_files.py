@@ -0,0 +1,330 @@
+import os
+import stat
+import threading
+from collections import OrderedDict
+from email.utils import formatdate
+from mimetypes import guess_type
+from typing import FrozenSet, List, Optional, Tuple
+from urllib.parse import parse_qs
+import anyio
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import RedirectResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Receive, Scope, Send
+from app.core.cache import LRUCache
+from app.core.compression import parse_accept_encoding
+from app.core.config import settings
+from app.core.storage import IMMUTABLE_CACHE_CONTROL, media_storage
+from app.utils.media_keys import is_content_addressed, media_relpath
+from app.services.media_derivatives import (
+    CONTENT_TYPES, DERIVED_PREFIX, FULL_SIZE, available_formats, derivative_prefix, derivatives_enabled,
+    rendered_variants, snap_width
+)
+
+# A negotiated request that fell back to the original: retry soon, the variant may exist by then
+FALLBACK_MAX_AGE = 60
+FALLBACK_CACHE_CONTROL = f"public, max-age={FALLBACK_MAX_AGE}"
+
+
+def accepted_formats(accept: str) -> List[str]:
+    # Only an explicit image/avif or image/webp counts; */* is sent by clients that cannot decode them
+    accepted = parse_accept_encoding(accept)  # Accept uses the same q-value grammar
+    return [extension for extension in available_formats() if accepted.get(CONTENT_TYPES[extension], 0.0) > 0]
+
+
+class _CachedFile:
+    def __init__(self, path: str):
+        # Unbuffered: reads go through os.pread and zero-copy servers use the descriptor directly
+        self.file = open(path, "rb", buffering=0)
+        stat_result = os.fstat(self.file.fileno())
+        self.identity = (stat_result.st_dev, stat_result.st_ino, stat_result.st_mtime_ns)
+        self.users = 0
+        self.evicted = False
+
+
+class FileDescriptorCache:
+    """Bounded LRU of open media files, so hot images are not re-opened on every request.
+
+    Entries are checked against the request's stat result, which replaces a
+    stale descriptor when the file was rewritten or deleted and recreated.
+    A descriptor evicted while a response is still reading from it is closed
+    by the last user.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._files: "OrderedDict[str, _CachedFile]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def acquire(self, path: str, stat_result: os.stat_result) -> _CachedFile:
+        identity = (stat_result.st_dev, stat_result.st_ino, stat_result.st_mtime_ns)
+        with self._lock:
+            entry = self._files.get(path)
+            if entry is not None and entry.identity == identity:
+                self._files.move_to_end(path)
+                entry.users += 1
+                self.hits += 1
+                return entry
+        entry = _CachedFile(path)
+        entry.users += 1
+        with self._lock:
+            self.misses += 1
+            if self.maxsize > 0:
+                self._evict(self._files.pop(path, None))
+                self._files[path] = entry
+                while len(self._files) > self.maxsize:
+                    self._evict(self._files.popitem(last=False)[1])
+                    self.evictions += 1
+            else:
+                entry.evicted = True
+        return entry
+
+    def release(self, entry: _CachedFile):
+        with self._lock:
+            entry.users -= 1
+            if entry.evicted and entry.users == 0:
+                entry.file.close()
+
+    def _evict(self, entry: Optional[_CachedFile]):
+        if entry is None:
+            return
+        entry.evicted = True
+        if entry.users == 0:
+            entry.file.close()
+
+    def stats(self) -> dict:
+        return {
+            "open": len(self._files),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+media_fd_cache = FileDescriptorCache(settings.MEDIA_FD_CACHE_SIZE)
+
+
+def parse_byte_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Return the inclusive (start, end) of a single-range request, or None to send the whole file.
+
+    Raises ValueError when the range cannot be satisfied. Malformed and
+    multi-range requests are answered with the full body, which RFC 9110 allows.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, last = (part.strip() for part in spec.partition("-")[::2])
+    if not (first.isdigit() or (not first and last.isdigit())) or (last and not last.isdigit()):
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        if int(last) == 0:
+            raise ValueError("empty suffix range")
+        return max(size - int(last), 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError("range not satisfiable")
+    return start, end
+
+
+class MediaFileResponse(Response):
+    """File response for /media with byte ranges and zero-copy transfer where the server allows it.
+
+    The body goes out through the ASGI ``http.response.zerocopysend`` (sendfile)
+    or ``http.response.pathsend`` extension when the server offers one; otherwise
+    it is read with os.pread from a cached descriptor in a worker thread.
+    """
+
+    chunk_size = 256 * 1024
+
+    def __init__(self, path: str, stat_result: os.stat_result, etag: str, cache_control: str,
+                 fd_cache: FileDescriptorCache = media_fd_cache):
+        self.path = path
+        self.stat_result = stat_result
+        self.fd_cache = fd_cache
+        self.status_code = 200
+        self.background = None
+        self.media_type = guess_type(path)[0] or "application/octet-stream"
+        self.init_headers({
+            "accept-ranges": "bytes",
+            "content-length": str(stat_result.st_size),
+            "last-modified": formatdate(stat_result.st_mtime, usegmt=True),
+            "etag": etag,
+            "cache-control": cache_control,
+        })
+
+    def _requested_range(self, headers: Headers) -> Optional[Tuple[int, int]]:
+        header = headers.get("range")
+        if header is None:
+            return None
+        if_range = headers.get("if-range")
+        # A stale If-Range validator means the client wants the whole new representation
+        if if_range is not None and if_range not in (self.headers["etag"], self.headers["last-modified"]):
+            return None
+        return parse_byte_range(header, self.stat_result.st_size)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        size = self.stat_result.st_size
+        try:
+            byte_range = self._requested_range(Headers(scope=scope))
+        except ValueError:
+            response = Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+            await response(scope, receive, send)
+            return
+
+        start, end = byte_range if byte_range is not None else (0, size - 1)
+        if byte_range is not None:
+            self.status_code = 206
+            self.headers["content-range"] = f"bytes {start}-{end}/{size}"
+            self.headers["content-length"] = str(end - start + 1)
+
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        count = end - start + 1
+        extensions = scope.get("extensions") or {}
+        if scope["method"] == "HEAD" or count <= 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        if byte_range is None and "http.response.pathsend" in extensions:
+            await send({"type": "http.response.pathsend", "path": self.path})
+            return
+
+        entry = await anyio.to_thread.run_sync(self.fd_cache.acquire, self.path, self.stat_result)
+        try:
+            if "http.response.zerocopysend" in extensions:
+                await send({"type": "http.response.zerocopysend", "file": entry.file, "offset": start, "count": count})
+                return
+            # pread does not move the shared file offset, so concurrent responses can share the descriptor
+            offset, remaining, fd = start, count, entry.file.fileno()
+            while remaining > 0:
+                chunk = await anyio.to_thread.run_sync(os.pread, fd, min(self.chunk_size, remaining), offset)
+                if not chunk:
+                    # The file shrank underneath us; end the body rather than hang the client
+                    await send({"type": "http.response.body", "body": b"", "more_body": False})
+                    break
+                offset += len(chunk)
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+        finally:
+            self.fd_cache.release(entry)
+
+
+class MediaFiles(StaticFiles):
+    """Serves /media: content-addressed originals, their derivatives, and legacy flat files.
+
+    ``?w=<px>`` selects the smallest configured width at least that wide, and the
+    format follows the Accept header. Anything without a derivative (not rendered
+    yet, never rendered for that size, or Pillow missing) falls back to the original
+    file; only the "not rendered yet" case is given a short cache lifetime.
+    Hashed names get a strong ETag derived from the sha256 and are cached as immutable.
+    With an object-store backend the negotiated object is answered with a redirect
+    to its (presigned or public) URL, so no media bytes pass through the API.
+    """
+
+    # Rendered variant names per original, so negotiation costs no storage round trip on a hit.
+    # Misses are cached too, for as long as the fallback response they produce
+    variant_manifests = LRUCache(maxsize=4096, ttl=300.0)
+
+    def candidates(self, path: str, scope: Scope) -> List[str]:
+        if not derivatives_enabled() or media_relpath(path) != path:
+            return []
+        width: Optional[str] = None
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        if query.get("w"):
+            try:
+                width = str(snap_width(int(query["w"][0])))
+            except ValueError:
+                raise HTTPException(status_code=400, detail="w must be an integer")
+
+        variant_prefix = derivative_prefix(path)
+        formats = accepted_formats(Headers(scope=scope).get("accept", ""))
+        if width is None:
+            return [f"{variant_prefix}/{FULL_SIZE}.{extension}" for extension in formats]
+        # The classic-format copy comes last for clients that accept neither avif nor webp
+        return [f"{variant_prefix}/{width}.{extension}" for extension in formats + ["jpg", "png"]]
+
+    async def rendered(self, path: str) -> Optional[FrozenSet[str]]:
+        cached = self.variant_manifests.get(path)
+        if cached is None:
+            variants = await anyio.to_thread.run_sync(rendered_variants, path)
+            cached = (variants,)
+            self.variant_manifests.set(path, cached, ttl=None if variants is not None else FALLBACK_MAX_AGE)
+        return cached[0]
+
+    async def negotiate(self, path: str, scope: Scope) -> Tuple[List[str], bool]:
+        """The candidates that were rendered, and whether rendering is still pending."""
+        candidates = self.candidates(path, scope)
+        if not candidates:
+            return [], False
+        variants = await self.rendered(path)
+        if variants is None:
+            return [], True
+        # Variants left out on purpose (e.g. no full.<ext> for originals wider than every width)
+        # are not pending: the original is the answer for good
+        return [candidate for candidate in candidates if os.path.basename(candidate) in variants], False
+
+    def resolve(self, paths: List[str]) -> Tuple[Optional[str], str, Optional[os.stat_result]]:
+        # One worker-thread hop for all candidates instead of one per stat
+        for path in paths:
+            try:
+                full_path, stat_result = self.lookup_path(path)
+            except (OSError, ValueError):
+                continue
+            if stat_result is not None and stat.S_ISREG(stat_result.st_mode):
+                return path, full_path, stat_result
+        return None, "", None
+
+    def validators(self, path: str, stat_result: os.stat_result, fallback: bool) -> Tuple[str, str]:
+        original, variant = path, None
+        if path.startswith(f"{DERIVED_PREFIX}/"):
+            original, variant = os.path.split(path[len(DERIVED_PREFIX) + 1:])
+        if is_content_addressed(original):
+            sha256 = os.path.splitext(os.path.basename(original))[0]
+            if variant is None:
+                etag = f'"{sha256}"'
+            else:
+                # Variants are re-rendered when the derivative settings change, so the mtime is part of the tag
+                etag = f'"{sha256}-{variant}-{stat_result.st_mtime_ns:x}"'
+            return etag, FALLBACK_CACHE_CONTROL if fallback else IMMUTABLE_CACHE_CONTROL
+        etag = f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+        return etag, FALLBACK_CACHE_CONTROL if fallback else f"public, max-age={settings.MEDIA_CACHE_MAX_AGE}"
+
+    async def redirect_response(self, path: str, candidates: List[str], fallback: bool) -> Response:
+        served = candidates[0] if candidates else media_relpath(path)
+        url = await anyio.to_thread.run_sync(media_storage.presigned_get, served, settings.MEDIA_PRESIGN_TTL)
+        # The redirect must not outlive the presigned URL it points at
+        max_age = min(settings.MEDIA_CACHE_MAX_AGE, settings.MEDIA_PRESIGN_TTL // 2)
+        response = RedirectResponse(url, status_code=307, headers={
+            "Cache-Control": FALLBACK_CACHE_CONTROL if fallback else f"public, max-age={max_age}",
+        })
+        if derivatives_enabled() and media_relpath(path) == path:
+            response.headers.append("Vary", "Accept")
+        return response
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if scope["method"] not in ("GET", "HEAD"):
+            raise HTTPException(status_code=405, headers={"Allow": "GET, HEAD"})
+        if any(part.startswith(".") for part in path.split("/")):
+            # Dot directories hold staged uploads and renders (LocalStorage's .tmp), never published media
+            raise HTTPException(status_code=404)
+        candidates, pending = await self.negotiate(path, scope)
+        if not media_storage.local:
+            return await self.redirect_response(path, candidates, pending)
+        served, full_path, stat_result = await anyio.to_thread.run_sync(self.resolve, candidates + [path])
+        if served is None:
+            raise HTTPException(status_code=404)
+
+        fallback = pending or (bool(candidates) and served == path)
+        etag, cache_control = self.validators(served, stat_result, fallback)
+        response = MediaFileResponse(full_path, stat_result, etag, cache_control)
+        if derivatives_enabled() and media_relpath(path) == path:
+            # Same URL, different bytes depending on Accept
+            response.headers.append("Vary", "Accept")
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -0,0 +1,26 @@
+import os
+import re
+from pathlib import Path
+from typing import Optional
+from app.core.config import MEDIA_DIR
+
+# Content-addressed keys shard on the first two byte pairs of the sha256 so no
+# directory grows past a few thousand entries: ab/cd/abcd...ef.webp
+CONTENT_KEY_RE = re.compile(r"^([0-9a-f]{2})/([0-9a-f]{2})/\1\2[0-9a-f]{60}\.[a-z0-9]{1,5}$")
+
+
+def media_key(sha256: str, extension: str) -> str:
+    return f"{sha256[:2]}/{sha256[2:4]}/{sha256}.{extension}"
+
+
+def is_content_addressed(name: Optional[str]) -> bool:
+    return bool(name) and CONTENT_KEY_RE.match(name) is not None
+
+
+def media_relpath(name: str) -> str:
+    # Legacy images are flat file names; anything else is reduced to its base name
+    return name if is_content_addressed(name) else os.path.basename(name)
+
+
+def media_path(name: str) -> Path:
+    return MEDIA_DIR / media_relpath(name)
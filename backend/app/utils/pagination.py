@@ -0,0 +1,55 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+from fastapi import HTTPException
+
+# Keyset cursors are opaque to clients: base64url(JSON[created_on, id, direction])
+CURSOR_NEXT = "next"
+CURSOR_PREV = "prev"
+
+
+def encode_cursor(created_on: datetime, row_id: int, direction: str = CURSOR_NEXT) -> str:
+    payload = json.dumps([created_on.isoformat(), row_id, direction], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_on, row_id, direction = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if direction not in (CURSOR_NEXT, CURSOR_PREV):
+            raise ValueError(f"Unknown cursor direction: {direction}")
+        return datetime.fromisoformat(created_on), int(row_id), direction
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+def page_cursors(rows, direction: Optional[str], has_more: bool):
+    """Return (next_cursor, prev_cursor) for a page of rows ordered newest first."""
+    if not rows:
+        return None, None
+    first, last = rows[0], rows[-1]
+    if direction == CURSOR_PREV:
+        # Walking backwards: an older page always exists, a newer one only if has_more
+        next_cursor = encode_cursor(last.created_on, last.id, CURSOR_NEXT)
+        prev_cursor = encode_cursor(first.created_on, first.id, CURSOR_PREV) if has_more else None
+    else:
+        next_cursor = encode_cursor(last.created_on, last.id, CURSOR_NEXT) if has_more else None
+        prev_cursor = encode_cursor(first.created_on, first.id, CURSOR_PREV) if direction else None
+    return next_cursor, prev_cursor
+
+
+# Search results are ordered by relevance, so their cursors carry base64url(JSON[rank, id]) instead
+def encode_rank_cursor(rank: float, row_id: int) -> str:
+    payload = json.dumps([rank, row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_rank_cursor(cursor: str) -> Tuple[float, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        rank, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return float(rank), int(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
@@ -0,0 +1,65 @@
+"""Before/after benchmark of list response serialisation on 1k-row pages.
+
+Run from the backend directory: python -m benchmarks.bench_serialization
+"""
+import json
+import timeit
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from fastapi.encoders import jsonable_encoder
+from app.core.responses import BulkSerializer, json_dumps
+from app.schemas.categories import CategoryModel
+
+ROWS = 1000
+REPEAT = 20
+
+now = datetime(2024, 1, 1)
+category_rows = [
+    SimpleNamespace(id=i, cat_id=f"cat_{i}", name=f"Category {i}", is_active=True,
+                    created_on=now + timedelta(minutes=i), updated_on=None)
+    for i in range(ROWS)
+]
+blog_rows = [
+    {
+        "category_id": 1, "category_name": "Category", "subcategory_id": 1, "subcategory_name": "Subcategory",
+        "id": i, "blog_id": f"blog_{i}", "blog_title": f"Title {i}", "blog_content": "lorem ipsum " * 200,
+        "blog_image": f"http://localhost:8000/media/blog_{i}.jpg", "is_active": True,
+        "created_on": now + timedelta(minutes=i), "updated_on": None,
+    }
+    for i in range(ROWS)
+]
+serialize_categories = BulkSerializer(CategoryModel)
+
+
+def generic_render(content):
+    # What FastAPI does for response_model=dict routes returning plain dicts
+    return json.dumps(jsonable_encoder(content), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def categories_before():
+    return generic_render({"data": [CategoryModel.from_orm(row) for row in category_rows]})
+
+
+def categories_after():
+    return json_dumps({"data": serialize_categories(category_rows)})
+
+
+def blogs_before():
+    return generic_render({"data": blog_rows})
+
+
+def blogs_after():
+    return json_dumps({"data": blog_rows})
+
+
+def report(name, before, after):
+    assert json.loads(before()) == json.loads(after()), f"{name}: outputs differ"
+    before_time = min(timeit.repeat(before, number=1, repeat=REPEAT)) * 1000
+    after_time = min(timeit.repeat(after, number=1, repeat=REPEAT)) * 1000
+    print(f"{name:<12} before {before_time:8.2f} ms   after {after_time:8.2f} ms   x{before_time / after_time:.1f}")
+
+
+if __name__ == "__main__":
+    print(f"{ROWS} rows per page, best of {REPEAT}")
+    report("categories", categories_before, categories_after)
+    report("blogs", blogs_before, blogs_after)
@@ -0,0 +1,113 @@
+"""Typeahead latency at scale: seed a scratch database with N blog titles and time suggestion lookups.
+
+Prints p50/p95/max per query kind (prefix, fuzzy, miss) for the whole
+typeahead call: the in-memory category/subcategory indexes plus the blog
+title queries. Point --database-url at a throwaway database: all of its app
+tables are dropped and reseeded.
+
+Run from the backend directory:
+    python -m benchmarks.bench_typeahead                     # temporary SQLite file, 1M titles
+    python -m benchmarks.bench_typeahead --database-url postgresql+asyncpg://.../scratch
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+parser.add_argument("--database-url", default=None, help="scratch database (default: a temporary SQLite file)")
+parser.add_argument("--rows", type=int, default=1_000_000, help="blog titles to seed")
+parser.add_argument("--categories", type=int, default=200)
+parser.add_argument("--subcategories", type=int, default=2000)
+parser.add_argument("--lookups", type=int, default=200, help="lookups per query kind")
+args = parser.parse_args()
+
+DATABASE_URL = args.database_url or f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/typeahead.db"
+# Settings are read at import time, so the app must see the scratch database before it is imported
+os.environ["DATABASE_URL"] = DATABASE_URL
+os.environ["DATABASE_REPLICA_URLS"] = "[]"
+
+from sqlalchemy import insert, text  # noqa: E402
+from app.core.database import Base, async_session, engine  # noqa: E402
+from app.models.blog import Blog  # noqa: E402
+from app.models.categories import Category  # noqa: E402
+from app.models.subcategories import Subcategory  # noqa: E402
+from app.services.typeahead import typeahead  # noqa: E402
+
+INSERT_CHUNK = 20_000
+rng = random.Random(7)
+SYLLABLES = ["ka", "lo", "mi", "ra", "ton", "vel", "qui", "sen", "dar", "po", "lis", "tra", "men", "zu", "bri", "nor"]
+WORDS = sorted({"".join(rng.choices(SYLLABLES, k=rng.randint(2, 4))) for _ in range(5000)})
+
+
+def phrase(words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def typo(word: str) -> str:
+    position = rng.randrange(1, len(word))
+    return word[:position] + word[position + 1:]
+
+
+async def seed():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    now = datetime.now()
+    async with async_session() as session:
+        await session.execute(insert(Category), [
+            {"id": i, "cat_id": f"cat_{i}", "name": f"{phrase(2)} {i}", "is_active": True, "created_on": now}
+            for i in range(1, args.categories + 1)
+        ])
+        await session.execute(insert(Subcategory), [
+            {"id": i, "category_id": i % args.categories + 1, "subcat_id": f"subcat_{i}", "name": f"{phrase(2)} {i}",
+             "is_active": True, "created_on": now}
+            for i in range(1, args.subcategories + 1)
+        ])
+        for start in range(1, args.rows + 1, INSERT_CHUNK):
+            await session.execute(insert(Blog), [
+                {"id": i, "subcategory_id": rng.randint(1, args.subcategories), "blog_id": f"blog_{i}",
+                 "title": f"{phrase(rng.randint(3, 6))} {i}", "content": "", "is_active": i % 20 != 0,
+                 "created_on": now}
+                for i in range(start, min(start + INSERT_CHUNK, args.rows + 1))
+            ])
+        await session.commit()
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("VACUUM ANALYZE" if conn.dialect.name == "postgresql" else "ANALYZE"))
+
+
+async def measure(label: str, queries):
+    timings = []
+    async with async_session() as db:
+        for query in queries:
+            started = time.perf_counter()
+            await typeahead(db, query, limit=5)
+            timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{label:<8} p50 {statistics.median(timings):7.2f} ms   p95 {p95:7.2f} ms   max {timings[-1]:7.2f} ms")
+
+
+async def main() -> int:
+    print(f"Seeding {args.rows} blog titles into {engine.url.render_as_string(hide_password=True)} ...")
+    started = time.perf_counter()
+    await seed()
+    print(f"Seeded in {time.perf_counter() - started:.0f} s")
+    # Load the taxonomy and its indexes before timing
+    async with async_session() as db:
+        await typeahead(db, "warmup")
+    await measure("prefix", [rng.choice(WORDS)[:rng.randint(2, 5)] for _ in range(args.lookups)])
+    await measure("fuzzy", [typo(rng.choice(WORDS)) for _ in range(args.lookups)])
+    await measure("miss", [f"xyz{rng.randint(0, 10 ** 6)}" for _ in range(args.lookups)])
+    await engine.dispose()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
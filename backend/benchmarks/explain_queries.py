@@ -0,0 +1,179 @@
+"""Plan check for the service queries: seed a scratch database, run each read path and EXPLAIN what it sent.
+
+Every SELECT the services issue is captured at the cursor level, re-run under
+EXPLAIN with its real parameters, and the script exits non-zero if any plan
+contains a sequential scan of a table with at least --min-rows rows (small
+lookup tables are cheaper to scan, so the planner is right to do so there).
+
+The schema comes from the models, whose indexes mirror the alembic migrations.
+Point --database-url at a throwaway database: all of its app tables are dropped and reseeded.
+
+Run from the backend directory:
+    python -m benchmarks.explain_queries                     # temporary SQLite file
+    python -m benchmarks.explain_queries --database-url postgresql+asyncpg://.../scratch --rows 1000000
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+parser.add_argument("--database-url", default=None, help="scratch database (default: a temporary SQLite file)")
+parser.add_argument("--rows", type=int, default=200_000, help="blog rows to seed")
+parser.add_argument("--min-rows", type=int, default=1000, help="sequential scans of smaller tables are allowed")
+parser.add_argument("--verbose", action="store_true", help="print every plan")
+args = parser.parse_args()
+
+DATABASE_URL = args.database_url or f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/explain.db"
+# Settings are read at import time, so the app must see the scratch database before it is imported
+os.environ["DATABASE_URL"] = DATABASE_URL
+os.environ["DATABASE_REPLICA_URLS"] = "[]"
+
+from sqlalchemy import event, insert, text  # noqa: E402
+from app.core.database import Base, async_session, engine  # noqa: E402
+from app.models.blog import Blog  # noqa: E402
+from app.models.categories import Category  # noqa: E402
+from app.models.subcategories import Subcategory  # noqa: E402
+from app.services import blog, blog_search, categories, media_gc, subcategories, typeahead  # noqa: E402
+from app.utils.pagination import encode_cursor  # noqa: E402
+
+CATEGORIES = 50
+SUBCATEGORIES = 500
+INSERT_CHUNK = 10_000
+SQLITE_SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?$")
+
+# (label, SQLite scan allowance or None, [(statement, parameters)])
+captured = []
+
+
+def capture(conn, cursor, statement, parameters, context, executemany):
+    if statement.lstrip().upper().startswith("SELECT") and not executemany:
+        captured[-1][2].append((statement, parameters))
+
+
+async def seed():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    now = datetime.now()
+    rng = random.Random(42)
+    async with async_session() as session:
+        await session.execute(insert(Category), [
+            {"id": i, "cat_id": f"cat_{i}", "name": f"Category {i}", "is_active": True, "created_on": now}
+            for i in range(1, CATEGORIES + 1)
+        ])
+        await session.execute(insert(Subcategory), [
+            {"id": i, "category_id": i % CATEGORIES + 1, "subcat_id": f"subcat_{i}", "name": f"Subcategory {i}",
+             "is_active": i % 10 != 0, "created_on": now}
+            for i in range(1, SUBCATEGORIES + 1)
+        ])
+        for start in range(1, args.rows + 1, INSERT_CHUNK):
+            await session.execute(insert(Blog), [
+                {"id": i, "category_id": None, "subcategory_id": rng.randint(1, SUBCATEGORIES),
+                 "blog_id": f"blog_{i}", "title": f"Title {i}", "content": "x" * 200,
+                 "image": f"image_{i}.jpg" if i % 3 == 0 else None, "is_active": i % 20 != 0,
+                 "created_on": now - timedelta(minutes=args.rows - i),
+                 "updated_on": now - timedelta(minutes=(args.rows - i) // 2) if i % 5 == 0 else None}
+                for i in range(start, min(start + INSERT_CHUNK, args.rows + 1))
+            ])
+        await session.commit()
+    async with engine.connect() as conn:
+        # Fresh statistics (and, on PostgreSQL, a visibility map for index-only scans)
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("VACUUM ANALYZE" if conn.dialect.name == "postgresql" else "ANALYZE"))
+
+
+async def run(label: str, call, sqlite_scan_ok: str = None):
+    # sqlite_scan_ok explains why a SQLite-only table walk is acceptable; it never excuses PostgreSQL plans
+    captured.append((label, sqlite_scan_ok, []))
+    async with async_session() as db:
+        result = call(db)
+        if hasattr(result, "__aiter__"):
+            async for _ in result:
+                pass
+        else:
+            await result
+
+
+async def exercise():
+    middle = args.rows // 2
+    cursor = encode_cursor(datetime.now() - timedelta(minutes=middle), middle)
+    await run("blog list (offset)", lambda db: blog.get_all_blog_detail(db, skip=100, limit=10),
+              sqlite_scan_ok="walks the rowid (primary key) backwards and stops at the LIMIT")
+    await run("blog list (keyset)", lambda db: blog.get_all_blog_detail(db, cursor=cursor, limit=10, include_total=False))
+    await run("blog detail", lambda db: blog.get_blog_detail_by_id(db, middle))
+    await run("blogs of a subcategory", lambda db: blog.get_blogdetail_by_subcategory_id(db, 7, skip=0, limit=10))
+    await run("blog export (since)", lambda db: blog.stream_blog_export(since=datetime.now() - timedelta(minutes=30)),
+              sqlite_scan_ok="no selectivity estimate for coalesce(); PostgreSQL uses ix_blog_modified_on")
+    await run("blog search", lambda db: blog_search.search_blogs(db, f"title {middle}", limit=10))
+    await run("blog search (subcategory)", lambda db: blog_search.search_blogs(db, "title", subcategory_id=7, limit=10))
+    await run("typeahead (prefix)", lambda db: typeahead.suggest_blog_titles(db, f"title {middle // 10}", 5))
+    await run("typeahead (fuzzy)", lambda db: typeahead.suggest_blog_titles(db, f"titel {middle}", 5))
+    await run("categories list", lambda db: categories.get_all_categories(db))
+    await run("subcategories list", lambda db: subcategories.get_all_subcategories(db))
+    await run("subcategories of a category", lambda db: subcategories.get_subcategories_by_category_id(db, 3))
+    await run("media gc references", lambda db: media_gc._referenced(
+        [f"image_{i}.jpg" for i in range(3, 3000, 3)], datetime.now()))
+
+
+def sequential_scans(dialect: str, plan) -> list:
+    if dialect == "postgresql":
+        found = []
+
+        def walk(node):
+            if node.get("Node Type") == "Seq Scan":
+                found.append(node["Relation Name"])
+            for child in node.get("Plans", []):
+                walk(child)
+
+        walk(plan[0]["Plan"])
+        return found
+    return [match.group(1) for row in plan if (match := SQLITE_SCAN.match(row[-1]))]
+
+
+async def explain() -> int:
+    failures = 0
+    async with engine.connect() as conn:
+        dialect = conn.dialect.name
+        sizes = {}
+        for table in Base.metadata.sorted_tables:
+            sizes[table.name] = await conn.scalar(text(f"SELECT count(*) FROM {table.name}"))
+        prefix = "EXPLAIN (FORMAT JSON) " if dialect == "postgresql" else "EXPLAIN QUERY PLAN "
+        for label, sqlite_scan_ok, statements in captured:
+            for statement, parameters in statements:
+                rows = (await conn.exec_driver_sql(prefix + statement, parameters)).all()
+                plan = rows[0][0] if dialect == "postgresql" else rows
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                scans = [table for table in sequential_scans(dialect, plan) if sizes.get(table, 0) >= args.min_rows]
+                if scans and dialect == "sqlite" and sqlite_scan_ok:
+                    print(f"{'ok (sqlite)':<28} {label}: {sqlite_scan_ok}")
+                    continue
+                failures += bool(scans)
+                verdict = f"SEQ SCAN on {', '.join(scans)}" if scans else "ok"
+                print(f"{verdict:<28} {label}: {' '.join(statement.split())[:110]}")
+                if args.verbose or scans:
+                    details = json.dumps(plan, indent=2) if dialect == "postgresql" else "\n".join(row[-1] for row in plan)
+                    print("    " + details.replace("\n", "\n    "))
+    return failures
+
+
+async def main() -> int:
+    print(f"Seeding {args.rows} blogs into {engine.url.render_as_string(hide_password=True)} ...")
+    await seed()
+    event.listen(engine.sync_engine, "before_cursor_execute", capture)
+    await exercise()
+    event.remove(engine.sync_engine, "before_cursor_execute", capture)
+    failures = await explain()
+    await engine.dispose()
+    print(f"\n{failures} statement(s) with a sequential scan of a table of {args.min_rows}+ rows")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))